@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keys per SELECT ... IN (...); older SQLite builds reject statements with more than 999 parameters
+SQLITE_MAX_PARAMS = 900
+
+
+class CachedEmbedder:
+    """
+    Wraps an embedding function with an in-process LRU and a persistent SQLite cache.
+    Entries are keyed by sha256 of (model, dimensions, text) and stored as packed float32 bytes,
+    so repeated texts never reach the embedding provider twice (even across runs).
+    Embeddings are returned as float32 numpy arrays (4 bytes per dimension, rather than a
+    boxed Python float each), which CustomMongoClient accepts as is.
+    Provider errors propagate and are never cached.
+
+    Usage:
+        embedder = CachedEmbedder(get_embedding, get_embeddings, model="text-embedding-3-small")
+        client = CustomMongoClient(uri, get_embedding=embedder.get_embedding,
+                                   get_embeddings=embedder.get_embeddings)
+    """
+    def __init__(
+        self,
+        get_embedding: Callable[[str], List[float]],
+        get_embeddings: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        model: str = "",
+        dimensions: Optional[int] = None,
+        path: Optional[str] = "./emb_cache.sqlite3",
+        maxsize: int = 4096,
+        key: Optional[Callable[[Any], bytes]] = None,
+    ):
+        """
+        :param get_embedding: function embedding a single text
+        :param get_embeddings: optional function embedding a list of texts in one request
+        :param model: model name mixed into the cache key
+        :param dimensions: requested embedding size mixed into the cache key (for models with
+            configurable output size, e.g. text-embedding-3-small)
+        :param path: SQLite file for the persistent cache (None keeps the cache in memory only)
+        :param maxsize: number of embeddings kept in the in-process LRU
+        :param key: function returning the bytes that identify a non-text input (e.g. an image's
+            pixels), for embedding functions that take images; texts are keyed by their UTF-8 bytes
+        """
+        self._get_embedding = get_embedding
+        self._get_embeddings = get_embeddings
+        self.model = model
+        self.dimensions = dimensions
+        self.maxsize = maxsize
+        self._key_bytes = key
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+            logger.info(f"CachedEmbedder: using persistent cache at '{path}'.")
+
+    def _key(self, text: Any) -> bytes:
+        material = self._key_bytes(text) if self._key_bytes is not None else text.encode("utf-8")
+        return hashlib.sha256(f"{self.model}\x00{self.dimensions}\x00".encode("utf-8") + material).digest()
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Returns the cached embeddings for `keys`, checking the LRU first and then SQLite.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+
+            missing = list(dict.fromkeys(key for key in keys if key not in found))
+            if self._db is not None and missing:
+                for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+                    chunk = missing[start:start + SQLITE_MAX_PARAMS]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, found[key])
+        return found
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _store(self, items: Dict[bytes, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()],
+                )
+                self._db.commit()
+
+    def get_embedding(self, text: str) -> Optional[np.ndarray]:
+        """
+        Returns the embedding for a single text, calling the provider only on a cache miss.
+        """
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Returns embeddings for `texts`. Only the distinct uncached texts are sent to the
+        provider, in a single batched call when a batch function is available.
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+
+        uncached = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                uncached.setdefault(key, text)
+
+        if uncached:
+            logger.debug(f"CachedEmbedder: {len(uncached)} uncached text(s) out of {len(texts)}.")
+            miss_texts = list(uncached.values())
+            if self._get_embeddings is not None:
+                vectors = self._get_embeddings(miss_texts)
+            else:
+                vectors = [self._get_embedding(text) for text in miss_texts]
+
+            # Failed embeddings (None) are returned but never cached
+            fresh = {}
+            for key, vector in zip(uncached, vectors):
+                if vector is not None:
+                    fresh[key] = np.asarray(vector, dtype=np.float32).ravel()
+            self._store(fresh)
+            found.update(fresh)
+
+        # Copies, so callers can't modify the cached vectors
+        return [found[key].copy() if key in found else None for key in keys]
+
+    def close(self) -> None:
+        """
+        Closes the persistent cache.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
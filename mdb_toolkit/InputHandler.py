@@ -1,6 +1,13 @@
+import base64
+import os
+import tempfile
 from abc import ABC, abstractmethod
+from collections import deque
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import NoCredentialsError
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+from itertools import islice
 
 import fitz  # PyMuPDF
 from PIL import Image
@@ -22,6 +29,65 @@ def upload_to_s3(local_file, s3_client, bucket_name, s3_key):
         return False
 
 
+# Longest side, in pixels, PDF pages are rendered at; larger renders are downsampled by the model anyway
+TARGET_RENDER_PX = 1024
+MIN_ZOOM = 0.5
+# Small pages (slides, receipts) are upscaled at most 2x; beyond that the model sees no more detail
+MAX_ZOOM = 2.0
+# JPEG quality for rendered PDF pages sent to the embedding model
+JPEG_QUALITY = 85
+# PDFs are downloaded in 8MB parts over several threads (ranged GETs). Fetching single pages by range
+# isn't possible in general: a page's objects, fonts and images are spread across the file and found
+# through the cross-reference table at its end, so the whole file is needed before any page renders
+PDF_TRANSFER_CONFIG = TransferConfig(multipart_chunksize=8 * 1024 * 1024, use_threads=True)
+# PDFs with fewer pages than this are rendered in-process; below it the pool startup costs more than it saves
+PARALLEL_RENDER_MIN_PAGES = 8
+# Pages rendered per task; pages are handed to the caller chunk by chunk instead of all at once
+RENDER_CHUNK_PAGES = 8
+# Rendered chunks allowed to run ahead of the caller, per worker process (bounds memory)
+RENDER_AHEAD_PER_WORKER = 2
+
+
+def image_segment(image_data, mime_type):
+    # multimodal_embed content segment for an already-encoded image
+    encoded = base64.b64encode(image_data).decode("ascii")
+    return {"type": "image_base64", "image_base64": f"data:{mime_type};base64,{encoded}"}
+
+
+def _sniff_mime_type(image_data):
+    # MIME type of an image format the embedding API accepts as-is (JPEG, PNG, WEBP, GIF), from its
+    # magic bytes, so S3 images can be forwarded without re-encoding; None for anything else
+    if image_data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if image_data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "image/webp"
+    if image_data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def _page_zoom(page, target_px, min_zoom, max_zoom):
+    # zoom that renders the page's longest side at target_px, clamped to [min_zoom, max_zoom]
+    zoom = target_px / max(page.rect.width, page.rect.height, 1)
+    return min(max(zoom, min_zoom), max_zoom)
+
+
+def _render_pages(pdf_path, start, end, target_px, min_zoom, max_zoom):
+    # render pages [start, end) of the PDF straight to JPEG; runs in a worker process, which
+    # opens its own document since PyMuPDF documents can't be shared across threads or processes
+    pdf = fitz.open(pdf_path, filetype="pdf")
+    pages = []
+    for n in range(start, end):
+        page = pdf[n]
+        zoom = _page_zoom(page, target_px, min_zoom, max_zoom)  # per page: sizes can differ within a PDF
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        pages.append(pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY))
+    pdf.close()
+    return pages
+
+
 class InputHandler(ABC):
     @abstractmethod
     def preprocess(self, input):
@@ -40,27 +106,48 @@ class InputHandler(ABC):
 
 class S3PDFHandler(InputHandler):
 
-    def _pdf_to_screenshots(self, s3_client, bucket_name, s3_key, zoom=3.0):
-        # open the PDF from S3 and extract the images
-        pdf_data = s3_client.get_object(Bucket=bucket_name, Key=s3_key)["Body"].read()
-
-        pdf_stream = BytesIO(pdf_data)
-        pdf = fitz.open(stream=pdf_stream, filetype="pdf")
-
-        images = []
-
-        # Loop through each page, render as pixmap, and convert to PIL Image
-        mat = fitz.Matrix(zoom, zoom)
-        for n in range(pdf.page_count):
-            pix = pdf[n].get_pixmap(matrix=mat)
-
-            # Convert pixmap to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append(img)
-
-        # Close the document
-        pdf.close()
-        return images
+    def _pdf_to_screenshots(self, s3_client, bucket_name, s3_key, target_px=TARGET_RENDER_PX, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+        # download the PDF from S3 to a temporary file (parallel ranged gets) and yield one image
+        # segment per page, in page order; the file is opened by path, so the PDF is never held in
+        # memory or copied to each worker, and only a few rendered chunks exist at any time.
+        # The file lives in a temporary directory and is closed before it is reopened by path,
+        # which an open NamedTemporaryFile does not allow on Windows
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "input.pdf")
+            with open(pdf_path, "wb") as pdf_file:
+                s3_client.download_fileobj(bucket_name, s3_key, pdf_file, Config=PDF_TRANSFER_CONFIG)
+
+            pdf = fitz.open(pdf_path, filetype="pdf")
+            page_count = pdf.page_count
+            pdf.close()
+
+            ranges = [
+                (pdf_path, start, min(start + RENDER_CHUNK_PAGES, page_count), target_px, min_zoom, max_zoom)
+                for start in range(0, page_count, RENDER_CHUNK_PAGES)
+            ]
+            # Encoding the pixmap once as JPEG skips the PIL copy and the client's lossless WEBP re-encode
+            workers = min(os.cpu_count() or 1, len(ranges))
+            if page_count < PARALLEL_RENDER_MIN_PAGES or workers <= 1:
+                for args in ranges:
+                    for page in _render_pages(*args):
+                        yield image_segment(page, "image/jpeg")
+                return
+
+            # Rasterizing is CPU-bound, so chunks are rendered in separate processes, a bounded
+            # number ahead of the caller; results are consumed in submission (page) order
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                remaining = iter(ranges)
+                in_flight = deque(
+                    executor.submit(_render_pages, *args)
+                    for args in islice(remaining, workers * RENDER_AHEAD_PER_WORKER)
+                )
+                while in_flight:
+                    pages = in_flight.popleft().result()
+                    args = next(remaining, None)
+                    if args is not None:
+                        in_flight.append(executor.submit(_render_pages, *args))
+                    for page in pages:
+                        yield image_segment(page, "image/jpeg")
     
 
     def preprocess(self, s3_client, input):
@@ -73,9 +160,20 @@ class S3PDFHandler(InputHandler):
 class S3ImageHandler(InputHandler):
 
     def _open_s3_image(self, s3_client, bucket_name, s3_key):
+        # read in full: the original bytes are what gets forwarded to the embedding model
         image_data = s3_client.get_object(Bucket=bucket_name, Key=s3_key)["Body"].read()
-        img = Image.open(BytesIO(image_data))
-        return img
+        # formats the API accepts are recognised by their magic bytes, without involving PIL
+        mime_type = _sniff_mime_type(image_data)
+        if mime_type is not None:
+            return image_segment(image_data, mime_type)
+
+        # other formats (e.g. TIFF, BMP) are decoded and re-encoded once as JPEG; since they are
+        # decoded anyway, large ones are also scaled down to the size PDF pages are rendered at
+        img = Image.open(BytesIO(image_data)).convert("RGB")
+        img.thumbnail((TARGET_RENDER_PX, TARGET_RENDER_PX))
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+        return image_segment(buffer.getvalue(), "image/jpeg")
     
     def preprocess(self, s3_client, input):
         file_metadata = super().parse_metadata(input)
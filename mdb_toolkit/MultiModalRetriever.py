@@ -1,78 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from voyageai import Client
 from mdb_toolkit.InputHandler import PDFHandler, ImageHandler, S3PDFHandler, S3ImageHandler
+from mdb_toolkit.core import to_bson_vector, with_backoff
 
 MODEL_NAME = "voyage-multimodal-3"
+# Maximum number of inputs sent in a single multimodal_embed request
+VOYAGE_BATCH = 128
+# Maximum number of documents written in a single insert_many call
+INSERT_BATCH = 1000
+PDF_EXT = (".pdf",)
+# "per_page": one embedding (and stored document) per page/image, tagged with its page number
+# "per_doc": all pages of a file embedded together as a single input, one document per file
+EMBED_MODES = ("per_page", "per_doc")
 
 
 class MultiModalRetriever():
-    def __init__(self, mongo_client, database_name, collection_name, index_name, s3_client, bucket_name, voyage_api_key):
+    def __init__(self, mongo_client, database_name, collection_name, index_name, s3_client, bucket_name, voyage_api_key=None, max_workers=5, embed_mode="per_page", voyage_client=None):
+        if embed_mode not in EMBED_MODES:
+            raise ValueError(f"embed_mode must be one of {EMBED_MODES}, got '{embed_mode}'")
         self.client = mongo_client
         self.database_name = database_name
         self.collection_name = collection_name
         self.index_name = index_name
         self.s3 = s3_client
         self.bucket_name = bucket_name
-        self.vo = self._get_voyage_client(voyage_api_key)
+        # an existing voyageai.Client (e.g. the one behind the caller's get_embedding) shares its
+        # connection pool; otherwise one is built from voyage_api_key
+        self.vo = voyage_client if voyage_client is not None else self._get_voyage_client(voyage_api_key)
+        self.max_workers = max_workers
+        self.embed_mode = embed_mode
+        # handlers are stateless, so one of each is built up front;
+        # indexed by (is_s3, is_pdf) in _create_input_processor
+        self._handlers = {
+            (True, True): S3PDFHandler(),
+            (True, False): S3ImageHandler(),
+            (False, True): PDFHandler(bucket_name=self.bucket_name),
+            (False, False): ImageHandler(bucket_name=self.bucket_name),
+        }
 
 
     def _get_voyage_client(self, voyage_api_key):
+        # created once per retriever and reused by every mm_embed call (and the embedding threads)
         return Client(api_key=voyage_api_key)
 
 
     def _create_input_processor(self, input):
-        input_format = "pdf"
-        if input.startswith("s3://"):
-            if input.endswith(".pdf"):
-                return S3PDFHandler()
-            else:
-                return S3ImageHandler()
-        else: 
-            if input.endswith(".pdf"):
-                return PDFHandler(bucket_name=self.bucket_name)
-            else:
-                return ImageHandler(bucket_name=self.bucket_name)
+        return self._handlers[(input.startswith("s3://"), input.lower().endswith(PDF_EXT))]
     
     
     def _create_embedding(self, processed_inputs):
         # handle parsing out images from pdfs, and/or pulling images from s3
-        # create and return the actual embeddings
-        return np.array(
-            self.vo.multimodal_embed(
-            inputs=[[x] for x in processed_inputs],
+        # each input is a list of content segments that yields one embedding;
+        # create and return the actual embeddings, one request per VOYAGE_BATCH inputs;
+        # several batches are sent concurrently since the calls are network-bound
+        batches = [processed_inputs[start:start + VOYAGE_BATCH] for start in range(0, len(processed_inputs), VOYAGE_BATCH)]
+        if len(batches) <= 1 or self.max_workers <= 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(self._embed_batch, batches))  # keeps input order
+
+        embeddings = []
+        for batch_embeddings in results:
+            embeddings.extend(batch_embeddings)
+        # one C-level conversion to float32 for the whole chunk; each row is then a contiguous
+        # view that to_bson_vector packs without a per-row dtype conversion
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _embed_batch(self, batch):
+        # one multimodal_embed request, retried with backoff when rate limited (see with_backoff);
+        # handlers yield ready-made image_base64 segments, so the client does no image encoding
+        return with_backoff(
+            self.vo.multimodal_embed,
+            inputs=[{"content": segments} for segments in batch],
             model=MODEL_NAME,
             input_type="document"
-        ).embeddings)
-
-    def _store_embedding(self, document_vectors, metadata):
-        # store the embeddings in mongodb alongside the 
-        # file metadata in S3
-        for i, doc_vector in enumerate(document_vectors):
-            self.client[self.database_name][self.collection_name].insert_one({
-                "s3_full_path": metadata["s3_full_path"],
-                "s3_bucket_name": metadata["s3_bucket_name"],
-                "s3_key": metadata["s3_key"],
-                "content_embedding": doc_vector.tolist()
-            })
-        return True
+        ).embeddings
+
+    def _embedding_doc(self, doc_vector, metadata, page=None):
+        # one document per vector, carrying the file metadata in S3.
+        # vectors are stored as packed float32 binData (~4 bytes/dim instead of ~12 for an array of doubles)
+        return {
+            "s3_full_path": metadata["s3_full_path"],
+            "s3_bucket_name": metadata["s3_bucket_name"],
+            "s3_key": metadata["s3_key"],
+            **({"page": page} if page is not None else {}),
+            "content_embedding": to_bson_vector(doc_vector)
+        }
+
+    def _insert_docs(self, docs):
+        # INSERT_BATCH documents per round trip, regardless of which file they came from
+        collection = self.client[self.database_name][self.collection_name]
+        for start in range(0, len(docs), INSERT_BATCH):
+            collection.insert_many(docs[start:start + INSERT_BATCH], ordered=False, bypass_document_validation=True)
 
     def mm_embed(self, inputs):
         # main entry point for the multimodal retriever utility
         # establishes embeddings for the input files and saves them
         # to mongodb
 
+        # pages are consumed as the handlers produce them (PDFs are rendered lazily) and
+        # embedded + stored every VOYAGE_BATCH * max_workers inputs (one round of concurrent
+        # requests), so memory holds one chunk of pages rather than every page of every file;
+        # in per_doc mode one file is one input
+        per_page = self.embed_mode == "per_page"
+        chunk_size = VOYAGE_BATCH * max(self.max_workers, 1)
+        chunk_inputs = []
+        chunk_metadata = []  # (file metadata, page number or None) per input
         for input_file in inputs:
             handler = self._create_input_processor(input_file)
             processed_inputs, metadata = handler.preprocess(self.s3, input_file)
-            document_vectors = self._create_embedding(processed_inputs)
-            self._store_embedding(document_vectors, metadata)
-        
+            if per_page:
+                file_inputs = (([page], (metadata, number)) for number, page in enumerate(processed_inputs))
+            else:
+                pages = list(processed_inputs)  # one pooled embedding for the whole file
+                file_inputs = [(pages, (metadata, None))] if pages else []
+            for segments, page_metadata in file_inputs:
+                chunk_inputs.append(segments)
+                chunk_metadata.append(page_metadata)
+                if len(chunk_inputs) >= chunk_size:
+                    self._embed_and_store(chunk_inputs, chunk_metadata)
+                    chunk_inputs, chunk_metadata = [], []
+
+        if chunk_inputs:
+            self._embed_and_store(chunk_inputs, chunk_metadata)
         return True
+
+    def _embed_and_store(self, chunk_inputs, chunk_metadata):
+        # embed one chunk of inputs and write a document per embedding, with its file metadata
+        document_vectors = self._create_embedding(chunk_inputs)
+        self._insert_docs([
+            self._embedding_doc(doc_vector, metadata, page)
+            for (metadata, page), doc_vector in zip(chunk_metadata, document_vectors)
+        ])
         
 
-    def mm_query(self, query, k=5):
+    def mm_query(self, query, k=5, fields=None):
         # query the multimodal retriever for the most similar
-        # documents to the query
+        # documents to the query; `fields` limits the returned fields (plus _id and score)
         vector_results = self.client.vector_search(
             query=query,
             limit=k,
@@ -80,6 +147,7 @@ class MultiModalRetriever():
             collection_name=self.collection_name,
             index_name=self.index_name,
             embedding_field="content_embedding", #voyageai :)
+            fields=fields,
         )
         return vector_results
 
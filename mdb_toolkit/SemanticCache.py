@@ -0,0 +1,204 @@
+import logging
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional (pip install mdb-toolkit[fast])
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+# Below this many cached rows numpy's BLAS mat-vec is already as fast as the JIT kernel
+NUMBA_MIN_ROWS = 1024
+
+
+def _best_match_numpy(matrix: np.ndarray, query: np.ndarray):
+    scores = matrix @ query
+    best = int(np.argmax(scores))
+    return best, float(scores[best])
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _best_match_numba(matrix, query):
+        n_rows, n_dims = matrix.shape
+        scores = np.empty(n_rows, dtype=np.float32)
+        for i in prange(n_rows):
+            score = np.float32(0.0)
+            for j in range(n_dims):
+                score += matrix[i, j] * query[j]
+            scores[i] = score
+        # Serial argmax: a shared running maximum inside prange would race
+        best = 0
+        for i in range(1, n_rows):
+            if scores[i] > scores[best]:
+                best = i
+        return best, scores[best]
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_scores_numba(matrix, query):
+        n_rows, n_dims = matrix.shape
+        query_norm = np.float32(0.0)
+        for j in range(n_dims):
+            query_norm += query[j] * query[j]
+        query_norm = np.sqrt(query_norm)
+        scores = np.zeros(n_rows, dtype=np.float32)
+        for i in prange(n_rows):
+            dot = np.float32(0.0)
+            row_norm = np.float32(0.0)
+            for j in range(n_dims):
+                dot += matrix[i, j] * query[j]
+                row_norm += matrix[i, j] * matrix[i, j]
+            if row_norm > 0 and query_norm > 0:
+                scores[i] = dot / (np.sqrt(row_norm) * query_norm)
+        return scores
+else:
+    _best_match_numba = None
+    _cosine_scores_numba = None
+
+
+def _best_match(matrix: np.ndarray, query: np.ndarray):
+    """
+    Returns (row index, dot product) of the row of `matrix` most similar to `query`.
+    Rows and query are unit length, so the dot product is the cosine similarity.
+    """
+    if _best_match_numba is not None and matrix.shape[0] >= NUMBA_MIN_ROWS:
+        best, score = _best_match_numba(matrix, query)
+        return int(best), float(score)
+    return _best_match_numpy(matrix, query)
+
+
+_warm_up_started = threading.Event()
+
+
+def warm_up() -> None:
+    """
+    Compiles the numba kernels (or loads them from numba's on-disk cache) on tiny inputs, so
+    the first real lookup or rerank does not pay the JIT compile time. No-op without numba.
+    """
+    if njit is None:
+        return
+    matrix = np.zeros((2, 4), dtype=np.float32)
+    query = np.zeros(4, dtype=np.float32)
+    _best_match_numba(matrix, query)
+    _cosine_scores_numba(matrix, query)
+    logger.debug("Numba similarity kernels ready.")
+
+
+def _warm_up_in_background() -> None:
+    # Once per process; a daemon thread so it never delays startup or exit
+    if njit is None or _warm_up_started.is_set():
+        return
+    _warm_up_started.set()
+    threading.Thread(target=warm_up, name="SemanticCache-warm-up", daemon=True).start()
+
+
+def _cosine_scores_numpy(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    dots = matrix @ query
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def cosine_topk(matrix: np.ndarray, query: np.ndarray, k: int) -> List[tuple]:
+    """
+    Returns (row index, cosine similarity) for the `k` rows of `matrix` most similar to `query`,
+    best first. Rows and query need not be normalized; zero vectors score 0.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    query = np.ascontiguousarray(query, dtype=np.float32).ravel()
+    if matrix.ndim != 2 or matrix.shape[0] == 0 or matrix.shape[1] != query.shape[0]:
+        return []
+
+    if _cosine_scores_numba is not None and matrix.shape[0] >= NUMBA_MIN_ROWS:
+        scores = _cosine_scores_numba(matrix, query)
+    else:
+        scores = _cosine_scores_numpy(matrix, query)
+
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return []
+    # Partial selection first so only the k winners are sorted
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(int(i), float(scores[i])) for i in top]
+
+
+class SemanticCache:
+    """
+    Caches search results by query embedding. A new query whose cosine similarity to a
+    cached query is at least `threshold` is answered from the cache, skipping the round trip
+    to the server. Entries are grouped by a caller-supplied key (e.g. database, collection,
+    index and limit) so results are only reused for identical search parameters.
+    """
+    def __init__(self, threshold: float = 0.86, max_entries: int = 512):
+        """
+        :param threshold: minimum cosine similarity for a cache hit
+        :param max_entries: maximum cached queries per key (oldest are evicted first)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._matrices: Dict[Hashable, np.ndarray] = {}
+        self._results: Dict[Hashable, List[List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        _warm_up_in_background()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return np.ascontiguousarray(vector / norm, dtype=np.float32)
+
+    def lookup(self, key: Hashable, embedding: Sequence[float]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cached results of the most similar query under `key`, or None on a miss.
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            matrix = self._matrices.get(key)
+            if matrix is None or matrix.shape[1] != query.shape[0]:
+                return None
+            best, score = _best_match(matrix, query)
+            if score < self.threshold:
+                return None
+            logger.debug(f"Semantic cache hit (similarity {score:.4f}).")
+            return [dict(doc) for doc in self._results[key][best]]
+
+    def add(self, key: Hashable, embedding: Sequence[float], results: List[Dict[str, Any]]) -> None:
+        """
+        Stores `results` for the query `embedding` under `key`.
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return
+
+        with self._lock:
+            matrix = self._matrices.get(key)
+            if matrix is None or matrix.shape[1] != query.shape[0]:
+                matrix = np.empty((0, query.shape[0]), dtype=np.float32)
+                self._results[key] = []
+
+            matrix = np.vstack([matrix, query[np.newaxis, :]])
+            self._results[key].append([dict(doc) for doc in results])
+
+            # Evict the oldest entries once the cache is full
+            overflow = matrix.shape[0] - self.max_entries
+            if overflow > 0:
+                matrix = matrix[overflow:]
+                del self._results[key][:overflow]
+            self._matrices[key] = matrix
+
+    def clear(self) -> None:
+        """
+        Drops all cached entries.
+        """
+        with self._lock:
+            self._matrices.clear()
+            self._results.clear()
@@ -5,12 +5,19 @@ import logging
 logger = logging.getLogger(__name__)
 logger.info("Initializing mdb_toolkit package")
 
-from .core import CustomMongoClient, Node, Edge
+from .core import CustomMongoClient, Node, Edge, to_bson_vector, to_int8_bson_vector, with_backoff
 from .MultiModalRetriever import MultiModalRetriever
+from .CachedEmbedder import CachedEmbedder
+from .SemanticCache import SemanticCache
 
 __all__ = [
     'CustomMongoClient',
     'Node',
     'Edge',
-    'MultiModalRetriever'
+    'to_bson_vector',
+    'to_int8_bson_vector',
+    'with_backoff',
+    'MultiModalRetriever',
+    'CachedEmbedder',
+    'SemanticCache'
 ]
@@ -1,16 +1,259 @@
+import asyncio
+import hashlib
 import logging
+import queue
+import random
+import re
+import sys
+import threading
 import time
-from typing import List, Optional, Dict, Any, Callable, Union
-from pymongo import MongoClient
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Callable, Sequence, Union
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype, VECTOR_SUBTYPE
+from bson.regex import Regex
+from pymongo import MongoClient, TEXT
 from pymongo.collection import Collection
+from pymongo.command_cursor import CommandCursor
 from pymongo.operations import SearchIndexModel
-from pymongo.errors import OperationFailure
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from pymongo.write_concern import WriteConcern
+
+from .SemanticCache import SemanticCache, cosine_topk
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 logger.info("Importing core module")
 
+# Known embedding sizes per model; avoids probing the embedding provider when creating indexes.
+# Models with a configurable size (e.g. text-embedding-3-*) are left out and probed instead.
+MODEL_DIMS: Dict[str, int] = {
+    "text-embedding-ada-002": 1536,
+    "nomic-embed-text": 768,
+    "voyage-3": 1024,
+    "voyage-3-lite": 512,
+    "voyage-multimodal-3": 1024,
+}
+
+
+def to_bson_vector(embedding: Sequence[float]) -> Binary:
+    """
+    Packs an embedding into a BSON binary vector (subtype 9) of little-endian float32 values.
+    This is 4 bytes per dimension instead of a BSON array of doubles, and is accepted by
+    Atlas Vector Search both as a stored field and as a queryVector.
+    """
+    vector = np.asarray(embedding, dtype="<f4").ravel()
+    # Header: dtype byte followed by the padding byte (always 0 for float32)
+    return Binary(BinaryVectorDtype.FLOAT32.value + b"\x00" + vector.tobytes(), subtype=VECTOR_SUBTYPE)
+
+
+def to_int8_bson_vector(embedding: Union[Sequence[float], Binary]) -> Binary:
+    """
+    Packs an embedding into a BSON int8 binary vector (1 byte per dimension, a quarter of
+    float32), scaling it so its largest component maps to +/-127. The scale is per vector, so
+    cosine similarity is preserved up to rounding error; use it for compact copies to re-rank
+    client-side (see CustomMongoClient.rerank) rather than where absolute values matter.
+    Accepts float lists/arrays or a float32 BSON vector.
+    """
+    if isinstance(embedding, Binary):
+        embedding = embedding.as_vector().data
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = 127.0 / peak if peak > 0 else 0.0
+    quantized = np.clip(np.rint(vector * scale), -127, 127).astype(np.int8)
+    return Binary(BinaryVectorDtype.INT8.value + b"\x00" + quantized.tobytes(), subtype=VECTOR_SUBTYPE)
+
+
+# Connection pool defaults, applied unless set via keyword arguments or the connection string
+DEFAULT_CLIENT_OPTIONS: Dict[str, Any] = {
+    "maxPoolSize": 100,
+    "minPoolSize": 10,
+    "waitQueueTimeoutMS": 2500,
+    "retryWrites": True,
+}
+
+
+@lru_cache(maxsize=1)
+def _available_compressors() -> str:
+    """
+    Returns the wire compressors to offer the server, best first: zstd and snappy when their
+    libraries can be imported, and always zlib (standard library) as the fallback.
+    The server picks the first one it also supports.
+    """
+    optional = []
+    try:
+        # The zstd module current PyMongo releases load (stdlib from 3.14, else backports.zstd);
+        # with only the older `zstandard` package installed zstd is simply not offered
+        if sys.version_info >= (3, 14):
+            from compression import zstd  # noqa: F401
+        else:
+            from backports import zstd  # noqa: F401
+        optional.append("zstd")
+    except ImportError:
+        pass
+    try:
+        import snappy  # noqa: F401
+        optional.append("snappy")
+    except ImportError:
+        pass
+    return ",".join(optional + ["zlib"])
+
+
+def _apply_client_defaults(args: tuple, kwargs: Dict[str, Any], wire_compression: bool = False) -> None:
+    """
+    Fills DEFAULT_CLIENT_OPTIONS (and, when `wire_compression` is set, the available compressors)
+    into `kwargs`, skipping any option already given as a keyword or in the connection string
+    (keywords would otherwise override the URI).
+    """
+    defaults = dict(DEFAULT_CLIENT_OPTIONS)
+    if wire_compression:
+        defaults["compressors"] = _available_compressors()
+        defaults["zlibCompressionLevel"] = -1  # zlib's default speed/size trade-off
+
+    host = args[0] if args else kwargs.get("host")
+    uri = host.lower() if isinstance(host, str) else ""
+    given = {key.lower() for key in kwargs}
+    given.update(option.lower() for option in defaults if f"{option.lower()}=" in uri)
+    if "maxpoolsize" in given:
+        # A caller-chosen pool may be smaller than our minPoolSize
+        given.add("minpoolsize")
+    for option, value in defaults.items():
+        if option.lower() not in given:
+            kwargs[option] = value
+
+
+# Embedded insert_documents groups allowed to wait for the writer thread (bounds memory)
+INSERT_QUEUE_DEPTH = 2
+
+# Cursor batch size used when search results are streamed, so consumers get the first
+# documents after one small batch instead of after the whole result set has been buffered
+STREAM_BATCH_SIZE = 200
+
+# Retries per embedding request when the provider rate limits, with exponential backoff and jitter
+EMBED_MAX_RETRIES = 5
+EMBED_RETRY_BASE_SECONDS = 0.5
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """
+    Returns True for provider errors worth retrying after a pause (HTTP 429 / 503).
+    Checked by status code and class name so no provider SDK needs to be imported.
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in (429, 503):
+        return True
+    name = type(error).__name__
+    return "RateLimit" in name or "ServiceUnavailable" in name
+
+
+def with_backoff(func: Callable, *args, **kwargs) -> Any:
+    """
+    Calls func(*args, **kwargs), retrying rate-limited calls (HTTP 429 / 503) up to
+    EMBED_MAX_RETRIES times with exponential backoff and jitter. Any other error, or the
+    last rate-limit error, propagates. Used for every embedding request (client, retriever, demos).
+    """
+    delay = EMBED_RETRY_BASE_SECONDS
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            logger.warning(f"Embedding request rate limited ({e}). Retrying in {delay:.1f}s.")
+            time.sleep(delay + random.uniform(0, delay))
+            delay *= 2
+
+
+def _wait_before_retry(
+    attempt: int,
+    status: str,
+    wait_seconds: float,
+    max_wait_seconds: float,
+    sleep: Callable[[float], Any] = time.sleep,
+) -> Any:
+    """
+    Logs `status` for failed poll `attempt` (1-based) and sleeps before the next one, returning
+    what `sleep` returns. The delay starts at `wait_seconds` and doubles up to `max_wait_seconds`,
+    plus up to 30% random jitter so separate processes polling one index don't do so in lockstep.
+    """
+    delay = min(max_wait_seconds, wait_seconds * 2 ** (attempt - 1))
+    delay += random.uniform(0, delay * 0.3)
+    logger.info(f"Attempt {attempt}: {status}. Waiting {delay:.2f} second(s)...")
+    return sleep(delay)
+
+# How long _create_search_index waits for a dropped legacy knnVector index to disappear
+LEGACY_INDEX_DROP_TIMEOUT_SECONDS = 120.0
+
+
+def _is_legacy_knn_index(index: Dict[str, Any]) -> bool:
+    """
+    Returns True for an Atlas Search ('search' type) index that maps a field as knnVector,
+    the deprecated predecessor of vectorSearch indexes.
+    """
+    if index.get("type", "search") != "search":
+        return False
+    definition = index.get("latestDefinition") or index.get("definition") or {}
+    for mapping in definition.get("mappings", {}).get("fields", {}).values():
+        mappings = mapping if isinstance(mapping, list) else [mapping]
+        if any(isinstance(m, dict) and m.get("type") == "knnVector" for m in mappings):
+            return True
+    return False
+
+
+def _index_num_dimensions(index: Dict[str, Any], path: str) -> Optional[int]:
+    """
+    Returns the numDimensions a vectorSearch index definition declares for the vector field
+    at `path`, or None if the index does not map that field as a vector.
+    """
+    definition = index.get("latestDefinition") or index.get("definition") or {}
+    for field in definition.get("fields", []):
+        if field.get("type") == "vector" and field.get("path") == path:
+            return field.get("numDimensions")
+    return None
+
+
+def _default_num_candidates(limit: int) -> int:
+    """
+    Returns the $vectorSearch numCandidates used when callers do not pass one: 20x the
+    limit (at least 150) for good HNSW recall, capped at the server maximum of 10,000.
+    """
+    return max(min(limit * 20, 10_000), 150, limit)
+
+
+def _result_projection(fields: Optional[List[str]], embedding_field: str) -> Dict[str, Any]:
+    """
+    Returns the projection for search results: only `fields` (plus _id) when given,
+    otherwise every field except the embedding and its int8 copy (see insert_documents).
+    """
+    if fields:
+        return {"_id": 1, **{field: 1 for field in fields}}
+    return {str(embedding_field): 0, f"{embedding_field}_int8": 0}
+
+
+def _search_projection(fields: Optional[List[str]], embedding_field: str, score_meta: str) -> List[Dict[str, Any]]:
+    """
+    Returns the stages shaping search results (see _result_projection), with the score added.
+    """
+    if fields:
+        return [{"$project": {**_result_projection(fields, embedding_field), "score": {"$meta": score_meta}}}]
+    return [
+        {"$project": _result_projection(fields, embedding_field)},
+        {"$set": {"score": {"$meta": score_meta}}},
+    ]
+
+
+@lru_cache(maxsize=256)
+def _keyword_regex(keyword: str) -> Regex:
+    """
+    Returns a case-insensitive regex matching `keyword` literally.
+    Escaping keeps user input from triggering pathological backtracking on the server.
+    """
+    return Regex(re.escape(keyword), "i")
+
 
 # --------------------------------------------------------------------
 # Node & Edge classes for Knowledge Graph
@@ -76,25 +319,40 @@ class _KGClient:
             # Clear existing data
             collection.delete_many({})
 
-            # Insert node docs
+            # Group edges by source in one pass instead of scanning every edge for every node
+            adjacency: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+            for edge in edges:
+                adjacency[edge.source_node.name].append({
+                    "relation": edge.relation,
+                    "target": edge.target_node.name
+                })
+
+            # Build all node docs first so they go to the server in one insert_many
+            docs = []
             for node_name, node_obj in nodes.items():
-                doc = {
+                docs.append({
                     "_id": node_name,
                     "type": node_obj.type,
-                    "edges": []
-                }
-
-                # For each edge starting from this node
-                for edge in edges:
-                    if edge.source_node.name == node_name:
-                        doc["edges"].append({
-                            "relation": edge.relation,
-                            "target": edge.target_node.name
-                        })
+                    "edges": adjacency.get(node_name, [])
+                })
 
-                collection.insert_one(doc)
+            inserted = 0
+            if docs:
+                try:
+                    collection.insert_many(docs, ordered=False, bypass_document_validation=True)
+                    inserted = len(docs)
+                except BulkWriteError as e:
+                    # Unordered: the remaining nodes were still written; report the failures
+                    # and let the caller know the graph is incomplete
+                    write_errors = e.details.get("writeErrors", [])
+                    logger.error(
+                        f"store_nodes_and_edges: {len(write_errors)} node(s) failed to insert "
+                        f"({e.details.get('nInserted', 0)} inserted). "
+                        f"First error: {write_errors[0].get('errmsg') if write_errors else e}"
+                    )
+                    raise
 
-            logger.info(f"store_nodes_and_edges: Inserted {len(nodes)} nodes into '{collection_name}'.")
+            logger.info(f"store_nodes_and_edges: Inserted {inserted} nodes into '{collection_name}'.")
 
         except Exception as e:
             logger.error(f"Error in store_nodes_and_edges: {e}")
@@ -104,11 +362,18 @@ class _KGClient:
         self,
         start_node_id: str,
         db_name: str,
-        collection_name: str
+        collection_name: str,
+        max_depth: Optional[int] = None,
+        restrict_search: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Performs a generic $graphLookup, starting from the document `_id == start_node_id`,
         traversing 'edges.target' -> '_id', collecting them into an array 'related_nodes'.
+        Each hop is an _id lookup, so it is served by the _id index.
+          - `max_depth` caps the traversal (0 = direct neighbours only); without it the whole
+            reachable component is visited, which on a densely connected graph is most of it.
+          - `restrict_search` (an MQL predicate, e.g. {"type": "company"}) limits which nodes
+            are visited and traversed through.
 
         Returns a list like:
           [
@@ -135,7 +400,9 @@ class _KGClient:
                         "connectFromField": "edges.target",
                         "connectToField": "_id",
                         "as": "related_nodes",
-                        "depthField": "depth"
+                        "depthField": "depth",
+                        **({"maxDepth": max_depth} if max_depth is not None else {}),
+                        **({"restrictSearchWithMatch": restrict_search} if restrict_search else {}),
                     }
                 },
                 {
@@ -157,16 +424,93 @@ class _KGClient:
             return []
 
 
+class _IndexPoller:
+    """Outcome of a background search-index readiness poll, shared by all waiters."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.ready = False
+        # Set once every waiter has cancelled, which ends the poll early
+        self.stop = threading.Event()
+        self.waiters = 0
+
+
 # --------------------------------------------------------------------
 # Main CustomMongoClient
 # --------------------------------------------------------------------
 class CustomMongoClient(MongoClient):
-    def __init__(self, *args, get_embedding: Callable[[str], List[float]], **kwargs):
+    def __init__(
+        self,
+        *args,
+        get_embedding: Callable[[str], List[float]],
+        get_embeddings: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        semantic_cache_threshold: Optional[float] = None,
+        semantic_cache_size: int = 512,
+        embedding_model: Optional[str] = None,
+        bson_vectors: bool = True,
+        normalize_embeddings: bool = False,
+        index_cache_ttl: float = 60.0,
+        query_cache_size: int = 1024,
+        wire_compression: bool = False,
+        **kwargs
+    ):
         """
         Initializes the CustomMongoClient with a get_embedding function.
+        Optionally accepts a get_embeddings function that embeds a list of texts
+        in a single request (used for bulk paths such as insert_documents).
+        When semantic_cache_threshold is set, vector_search reuses the results of a
+        previous query whose embedding has at least that cosine similarity (hybrid_search
+        does the same for queries with the same keyword).
+        embedding_model names the model behind get_embedding so its dimensions can be
+        looked up in MODEL_DIMS instead of probed.
+        Stored embeddings and query vectors are sent as packed float32 BSON binary vectors
+        (see to_bson_vector); pass bson_vectors=False to keep arrays of doubles, e.g. for
+        collections still indexed with a legacy knnVector mapping.
+        With normalize_embeddings=True, stored and query vectors are scaled to unit length and
+        cosine indexes are created as dotProduct, which skips the per-comparison normalization.
+        index_exists and is_index_ready remember found / READY indexes for index_cache_ttl seconds.
+        Connection pool options default to DEFAULT_CLIENT_OPTIONS (one client is meant to be
+        shared by the whole process); anything set explicitly or in the URI takes precedence.
+        Wire compression is off by default, since packed float32 vectors barely compress; with
+        wire_compression=True it is negotiated (zstd/snappy when installed, else zlib), which
+        helps workloads dominated by text and metadata.
+        Embeddings of the last query_cache_size string queries are kept, so repeated searches
+        (pagination, evaluation loops) skip the embedding call (0 disables this).
         """
+        _apply_client_defaults(args, kwargs, wire_compression)
         super().__init__(*args, **kwargs)
+        # Kept so the AsyncMongoClient behind the *_async methods can mirror this client's settings
+        self._client_args = (args, kwargs)
         self.get_embedding = get_embedding
+        self.get_embeddings = get_embeddings
+        self.embedding_model = embedding_model
+        # Embedding size learned from a probe, so unnamed models are only probed once per client
+        self._embedding_dim: Optional[int] = None
+        self.bson_vectors = bson_vectors
+        self.normalize_embeddings = normalize_embeddings
+        self.index_cache_ttl = index_cache_ttl
+        self.query_cache_size = query_cache_size
+        self._query_embeddings: "OrderedDict[str, Any]" = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        # (database, collection, index) -> time.monotonic() when the index was last seen
+        self._index_exists_cache: Dict[tuple, float] = {}
+        # (database, collection, index) -> time.monotonic() when the index was last seen READY
+        self._index_ready_cache: Dict[tuple, float] = {}
+        # (database, collection, index) -> time.monotonic() when an empty search last looked the index up
+        self._index_checked_cache: Dict[tuple, float] = {}
+        # (database, collection, index) -> poller shared by concurrent wait_for_index_ready calls
+        self._index_pollers: Dict[tuple, _IndexPoller] = {}
+        self._index_pollers_lock = threading.Lock()
+        # (database, collection) -> time.monotonic() when $text failed for lack of a text index
+        self._no_text_index_cache: Dict[tuple, float] = {}
+        # database -> collections known to exist (confirmed or created by create_if_not_exists)
+        self._known_collections: Dict[str, set] = {}
+        # (database, collection, hash field) whose hash index _stored_embeddings has ensured
+        self._hash_indexes: set = set()
+        self.semantic_cache = (
+            SemanticCache(threshold=semantic_cache_threshold, max_entries=semantic_cache_size)
+            if semantic_cache_threshold is not None
+            else None
+        )
 
         # Attach Knowledge Graph sub-namespace
         self.kg = _KGClient(self)
@@ -178,20 +522,29 @@ class CustomMongoClient(MongoClient):
     ) -> Collection:
         """
         Creates a collection if it does not exist in the specified database.
+        Collections seen to exist are remembered, so repeated calls make no server round trip
+        (a collection dropped behind this client's back is not noticed).
         """
         database = self[database_name]
-        collection_names = database.list_collection_names()
+        known = self._known_collections.setdefault(database_name, set())
+        if collection_name in known:
+            return database[collection_name]
 
-        if collection_name not in collection_names:
-            logger.info(f"Collection '{collection_name}' does not exist. Creating it now.")
+        # Create directly and treat NamespaceExists as "already there": one round trip either way,
+        # instead of listing collections first (which create_collection would also do by default)
+        try:
+            collection = database.create_collection(collection_name, check_exists=False)
+        except OperationFailure as e:
+            if e.code != 48:  # NamespaceExists
+                raise
             collection = database[collection_name]
-            # Insert and remove a placeholder document to create the collection
-            collection.insert_one({"_id": 0, "placeholder": True})
-            collection.delete_one({"_id": 0})
-            logger.info(f"Collection '{collection_name}' created successfully.")
         else:
-            collection = database[collection_name]
+            logger.info(f"Collection '{collection_name}' did not exist and was created.")
+            # Text index so keyword_search can use $text instead of a regex collection scan
+            collection.create_index([("content", TEXT)])
+            self._no_text_index_cache.pop((database_name, collection_name), None)
 
+        known.add(collection_name)
         return collection
 
     def _create_search_index(
@@ -200,40 +553,129 @@ class CustomMongoClient(MongoClient):
         collection_name: str,
         index_name: str,
         distance_metric: str = "cosine",
-        embedding_field: str = "embedding"
+        embedding_field: str = "embedding",
+        filter_fields: Optional[List[str]] = None,
+        num_dimensions: Optional[int] = None,
+        quantization: Optional[str] = None,
     ) -> None:
         """
         Creates a search index on the specified collection if it does not already exist.
+        Fields listed in `filter_fields` are indexed so vector_search `filters` can use them.
+        Pass `num_dimensions` when the embedding size is known to skip the lookup/probe
+        in _get_num_dimensions.
+        `quantization` ("scalar" or "binary") makes the server index int8 / 1-bit copies of the
+        stored float32 vectors, cutting index memory ~4x / ~32x; documents keep full precision
+        (binary-quantized results are rescored against the full-fidelity vectors).
+        An existing index of the same name that still uses the deprecated knnVector mapping is
+        dropped and recreated as a vectorSearch index.
         """
+        if quantization not in (None, "scalar", "binary"):
+            raise ValueError(f"quantization must be None, 'scalar' or 'binary', got '{quantization}'")
         try:
             self.create_if_not_exists(database_name, collection_name)
 
             if self.index_exists(database_name, collection_name, index_name):
-                logger.info(f"Search index '{index_name}' already exists in collection '{collection_name}'.")
-                return
+                collection = self[database_name][collection_name]
+                existing = next(collection.list_search_indexes(name=index_name), None)
+                if existing is None or not _is_legacy_knn_index(existing):
+                    logger.info(f"Search index '{index_name}' already exists in collection '{collection_name}'.")
+                    return
+                self._drop_legacy_search_index(database_name, collection_name, index_name)
 
             logger.info(f"Creating search index '{index_name}' for collection '{collection_name}'.")
 
-            # Generate a sample embedding to determine the number of dimensions
-            num_dimensions = len(self.get_embedding("sample text"))
+            if num_dimensions is None:
+                num_dimensions = self._get_num_dimensions()
+            if self.normalize_embeddings and distance_metric == "cosine":
+                # Cosine on unit vectors equals the dot product, without the norm computations
+                distance_metric = "dotProduct"
+            fields = [
+                {
+                    "type": "vector",
+                    "path": str(embedding_field),
+                    "numDimensions": num_dimensions,
+                    "similarity": distance_metric,
+                    **({"quantization": quantization} if quantization else {}),
+                }
+            ]
+            fields.extend({"type": "filter", "path": path} for path in filter_fields or [])
+            # A dedicated vectorSearch index (rather than a knnVector mapping in an Atlas Search
+            # index) is what $vectorSearch is built for, and the only kind that can hold BSON binary vectors
+            search_index_model = SearchIndexModel(
+                definition={"fields": fields},
+                name=index_name,
+                type="vectorSearch",
+            )
+
+            collection = self[database_name][collection_name]
+            collection.create_search_index(model=search_index_model)
+            self._index_exists_cache.pop((database_name, collection_name, index_name), None)
+            self._index_ready_cache.pop((database_name, collection_name, index_name), None)
+            self._index_checked_cache.pop((database_name, collection_name, index_name), None)
+            logger.info(f"Search index '{index_name}' created successfully for collection '{collection_name}'.")
+
+        except OperationFailure as e:
+            logger.error(f"Operation failed: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to create search index '{index_name}': {e}")
+            raise
+
+    def _drop_legacy_search_index(self, database_name: str, collection_name: str, index_name: str) -> None:
+        """
+        Drops a knnVector search index and waits (up to LEGACY_INDEX_DROP_TIMEOUT_SECONDS) until
+        the server has removed it, since an index cannot be recreated under a name still in use.
+        """
+        logger.warning(
+            f"Search index '{index_name}' uses the deprecated knnVector mapping. "
+            f"Dropping it to recreate it as a vectorSearch index."
+        )
+        collection = self[database_name][collection_name]
+        collection.drop_search_index(index_name)
+        self._index_exists_cache.pop((database_name, collection_name, index_name), None)
+        self._index_ready_cache.pop((database_name, collection_name, index_name), None)
+
+        deadline = time.monotonic() + LEGACY_INDEX_DROP_TIMEOUT_SECONDS
+        while next(collection.list_search_indexes(name=index_name), None) is not None:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Search index '{index_name}' was not removed within {LEGACY_INDEX_DROP_TIMEOUT_SECONDS}s.")
+            time.sleep(1)
+
+    def _create_text_search_index(
+        self,
+        database_name: str,
+        collection_name: str,
+        index_name: str,
+        text_fields: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Creates an Atlas Search index for keyword_search(search_index_name=...) if it does not
+        already exist. `text_fields` (default: ['content']) are indexed as analyzed strings.
+        """
+        try:
+            self.create_if_not_exists(database_name, collection_name)
+
+            if self.index_exists(database_name, collection_name, index_name):
+                logger.info(f"Search index '{index_name}' already exists in collection '{collection_name}'.")
+                return
+
+            logger.info(f"Creating text search index '{index_name}' for collection '{collection_name}'.")
             search_index_model = SearchIndexModel(
                 definition={
                     "mappings": {
                         "dynamic": False,
-                        "fields": {
-                            str(embedding_field): {
-                                "type": "knnVector",
-                                "dimensions": num_dimensions,
-                                "similarity": distance_metric,
-                            }
-                        },
+                        "fields": {path: {"type": "string"} for path in text_fields or ["content"]},
                     }
                 },
                 name=index_name,
+                type="search",
             )
 
             collection = self[database_name][collection_name]
             collection.create_search_index(model=search_index_model)
+            self._index_exists_cache.pop((database_name, collection_name, index_name), None)
+            self._index_ready_cache.pop((database_name, collection_name, index_name), None)
+            self._index_checked_cache.pop((database_name, collection_name, index_name), None)
             logger.info(f"Search index '{index_name}' created successfully for collection '{collection_name}'.")
 
         except OperationFailure as e:
@@ -243,22 +685,42 @@ class CustomMongoClient(MongoClient):
             logger.error(f"Failed to create search index '{index_name}': {e}")
             raise
 
+    def _get_num_dimensions(self) -> int:
+        """
+        Returns the embedding size, from MODEL_DIMS when the model is known and otherwise
+        by embedding a sample text once (memoized on the client, since the same model name can
+        be configured with different sizes by different clients).
+        """
+        if self.embedding_model in MODEL_DIMS:
+            return MODEL_DIMS[self.embedding_model]
+        if self._embedding_dim is not None:
+            return self._embedding_dim
+
+        # Generate a sample embedding to determine the number of dimensions
+        num_dimensions = len(self.get_embedding("sample text"))
+        self._embedding_dim = num_dimensions
+        return num_dimensions
+
     def index_exists(self, database_name: str, collection_name: str, index_name: str) -> bool:
         """
         Checks if a specific search index exists in the collection.
+        Positive answers are cached for `index_cache_ttl` seconds to keep the RPC off the search path.
         """
+        cache_key = (database_name, collection_name, index_name)
+        seen_at = self._index_exists_cache.get(cache_key)
+        if seen_at is not None and time.monotonic() - seen_at < self.index_cache_ttl:
+            return True
+
         try:
             collection = self[database_name][collection_name]
-            indexes = list(collection.list_search_indexes())
-            logger.debug(f"Retrieved indexes: {indexes}")
+            # Filtered by name server-side, so the first definition (if any) is the index
+            index = next(collection.list_search_indexes(name=index_name), None)
+            logger.debug(f"Retrieved index: {index}")
 
-            # Iterate through the indexes to check for a matching name
-            for index in indexes:
-                retrieved_name = index.get("name", "")
-                logger.debug(f"Checking index: {retrieved_name}")
-                if retrieved_name == index_name:
-                    logger.info(f"Found existing index '{index_name}'.")
-                    return True
+            if index is not None:
+                logger.info(f"Found existing index '{index_name}'.")
+                self._mark_index_seen(database_name, collection_name, index_name)
+                return True
 
             logger.info(f"Index '{index_name}' does not exist in collection '{collection_name}'.")
             return False
@@ -270,25 +732,57 @@ class CustomMongoClient(MongoClient):
             logger.error(f"Error checking search index existence for '{index_name}': {e}")
             return False
 
+    def _mark_index_seen(self, database_name: str, collection_name: str, index_name: str) -> None:
+        """
+        Records that the index was just observed to exist, restarting its index_exists TTL.
+        """
+        self._index_exists_cache[(database_name, collection_name, index_name)] = time.monotonic()
+
+    def _check_search_index(self, database_name: str, collection_name: str, index_name: str, found: bool) -> None:
+        """
+        Called after a search instead of checking the index up front. Hits prove the index
+        exists; $vectorSearch on a missing index returns no documents rather than an error,
+        so only an empty result is worth an index_exists lookup (to explain it in the log).
+        That lookup runs at most once per `index_cache_ttl`, so a stream of empty results
+        (e.g. selective filters) does not turn into one list_search_indexes call per search.
+        """
+        if found:
+            self._mark_index_seen(database_name, collection_name, index_name)
+            return
+
+        cache_key = (database_name, collection_name, index_name)
+        checked_at = self._index_checked_cache.get(cache_key)
+        if checked_at is not None and time.monotonic() - checked_at < self.index_cache_ttl:
+            return
+        self._index_checked_cache[cache_key] = time.monotonic()
+        if not self.index_exists(database_name, collection_name, index_name):
+            logger.error(f"Index '{index_name}' does not exist.")
+
     def is_index_ready(self, database_name: str, collection_name: str, index_name: str) -> bool:
         """
         Checks if the specified search index status is 'READY'.
+        READY answers are cached for `index_cache_ttl` seconds, like index_exists.
         """
+        cache_key = (database_name, collection_name, index_name)
+        ready_at = self._index_ready_cache.get(cache_key)
+        if ready_at is not None and time.monotonic() - ready_at < self.index_cache_ttl:
+            return True
+
         try:
             collection = self[database_name][collection_name]
-            indexes = list(collection.list_search_indexes())
-
-            for index in indexes:
-                if index.get("name") == index_name:
-                    status = index.get("status", "").upper()
-                    logger.debug(f"Index '{index_name}' status: {status}")
-                    if status == "READY":
-                        return True
-                    else:
-                        logger.info(f"Index '{index_name}' status: {status}")
-                        return False
-
-            logger.warning(f"Index '{index_name}' not found in collection '{collection_name}'.")
+            index = next(collection.list_search_indexes(name=index_name), None)
+
+            if index is None:
+                logger.warning(f"Index '{index_name}' not found in collection '{collection_name}'.")
+                return False
+
+            self._mark_index_seen(database_name, collection_name, index_name)
+            status = index.get("status", "").upper()
+            logger.debug(f"Index '{index_name}' status: {status}")
+            if status == "READY":
+                self._index_ready_cache[cache_key] = time.monotonic()
+                return True
+            logger.info(f"Index '{index_name}' status: {status}")
             return False
 
         except OperationFailure as e:
@@ -298,153 +792,813 @@ class CustomMongoClient(MongoClient):
             logger.error(f"Error checking search index status for '{index_name}': {e}")
             return False
 
-    def wait_for_index_ready(
+    def _get_index_statuses(self, database_name: str, collection_name: str) -> Dict[str, str]:
+        """
+        Returns {index name: status} for every search index on the collection, from a single
+        list_search_indexes call; also refreshes the index_exists / is_index_ready caches.
+        """
+        collection = self[database_name][collection_name]
+        now = time.monotonic()
+        statuses = {}
+        for index in collection.list_search_indexes():
+            name = index.get("name")
+            statuses[name] = index.get("status", "").upper()
+            self._index_exists_cache[(database_name, collection_name, name)] = now
+            if statuses[name] == "READY":
+                self._index_ready_cache[(database_name, collection_name, name)] = now
+        return statuses
+
+    def wait_for_indexes_ready(
+        self,
+        database_name: str,
+        collection_name: str,
+        index_names: List[str],
+        max_attempts: int = 10,
+        wait_seconds: float = 0.25,
+        max_wait_seconds: float = 4.0,
+    ) -> bool:
+        """
+        Waits until all of `index_names` (e.g. a vector and a text search index) are 'READY',
+        polling with one list_search_indexes call per attempt for all of them, with the same
+        backoff as wait_for_index_ready. Returns False if any is not READY after max_attempts.
+        """
+        pending = set(index_names)
+        for attempt in range(1, max_attempts + 1):
+            try:
+                statuses = self._get_index_statuses(database_name, collection_name)
+            except Exception as e:
+                logger.error(f"Error checking search index status on '{collection_name}': {e}")
+                statuses = {}
+            pending = {name for name in pending if statuses.get(name) != "READY"}
+            if not pending:
+                logger.info(f"Search indexes {sorted(index_names)} are READY.")
+                return True
+            if attempt == max_attempts:
+                break
+            _wait_before_retry(
+                attempt, f"Search indexes {sorted(pending)} not READY yet", wait_seconds, max_wait_seconds
+            )
+        logger.error(f"Search indexes {sorted(pending)} did not reach READY status after {max_attempts} attempts.")
+        return False
+
+    def wait_for_indexing(
         self,
         database_name: str,
         collection_name: str,
         index_name: str,
+        min_docs: int,
+        embedding_field: str = "embedding",
         max_attempts: int = 10,
-        wait_seconds: int = 1,
+        wait_seconds: float = 0.25,
+        max_wait_seconds: float = 4.0,
+        num_dimensions: Optional[int] = None,
     ) -> bool:
         """
-        Waits until the specified search index status is 'READY' or until max_attempts is reached.
+        Waits until the vector index is READY and searchable over at least `min_docs` documents
+        (capped at 10,000), e.g. right after insert_documents, instead of sleeping a fixed time.
+        Search indexes catch up with writes asynchronously; each poll runs an exact $vectorSearch
+        for `min_docs` hits and counts them. Uses the backoff of wait_for_index_ready.
+        The probe vector's size is `num_dimensions`, or else the index definition's numDimensions,
+        so no embedding call is made.
         """
-        attempt = 0
-        while attempt < max_attempts:
-            if self.is_index_ready(database_name, collection_name, index_name):
-                logger.info(f"Search index '{index_name}' is READY.")
+        if not self.wait_for_index_ready(
+            database_name, collection_name, index_name, max_attempts, wait_seconds, max_wait_seconds
+        ):
+            return False
+
+        collection = self[database_name][collection_name]
+        if num_dimensions is None:
+            try:
+                index = next(collection.list_search_indexes(name=index_name), None)
+            except OperationFailure as e:
+                logger.error(f"Error reading search index '{index_name}': {e}")
+                return False
+            num_dimensions = _index_num_dimensions(index or {}, str(embedding_field))
+            if not num_dimensions:
+                logger.error(f"Search index '{index_name}' has no vector field at path '{embedding_field}'.")
+                return False
+
+        target = max(1, min(min_docs, 10_000))
+        probe = self._encode_vector([1.0] * num_dimensions)
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": index_name,
+                    "path": str(embedding_field),
+                    "queryVector": probe,
+                    "exact": True,
+                    "limit": target,
+                }
+            },
+            {"$count": "indexed"},
+        ]
+        indexed = 0
+        for attempt in range(1, max_attempts + 1):
+            try:
+                counted = next(collection.aggregate(pipeline), None)
+                indexed = counted["indexed"] if counted else 0
+            except OperationFailure as e:
+                logger.error(f"Error counting documents in search index '{index_name}': {e}")
+                return False
+            if indexed >= target:
+                logger.info(f"Search index '{index_name}' covers {indexed} document(s).")
                 return True
-            attempt += 1
-            logger.info(
-                f"Attempt {attempt}: Search index '{index_name}' not READY yet. "
-                f"Waiting {wait_seconds} second(s)..."
+            if attempt == max_attempts:
+                break
+            _wait_before_retry(
+                attempt,
+                f"search index '{index_name}' covers {indexed}/{target} document(s)",
+                wait_seconds,
+                max_wait_seconds,
             )
-            time.sleep(wait_seconds)
-        logger.error(f"Search index '{index_name}' did not reach READY status after {max_attempts} attempts.")
+        logger.error(f"Search index '{index_name}' covered only {indexed}/{target} document(s) after {max_attempts} attempts.")
         return False
 
+    def wait_for_index_ready(
+        self,
+        database_name: str,
+        collection_name: str,
+        index_name: str,
+        max_attempts: int = 10,
+        wait_seconds: float = 0.25,
+        max_wait_seconds: float = 4.0,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> bool:
+        """
+        Waits until the specified search index status is 'READY' or until max_attempts is reached.
+        The delay between polls starts at `wait_seconds` and doubles up to `max_wait_seconds`,
+        plus up to 30% random jitter so separate processes waiting on one index don't poll in lockstep.
+        Concurrent callers waiting on the same index share a single background poller
+        (and its settings) instead of each polling the server.
+          - If `cancel_event` is set while waiting, returns False right away; the poller stops
+            once no other caller is still waiting on it.
+        """
+        key = (database_name, collection_name, index_name)
+        with self._index_pollers_lock:
+            poller = self._index_pollers.get(key)
+            if poller is None or poller.stop.is_set():
+                poller = _IndexPoller()
+                self._index_pollers[key] = poller
+                threading.Thread(
+                    target=self._poll_index_ready,
+                    args=(key, poller, max_attempts, wait_seconds, max_wait_seconds),
+                    daemon=True,
+                ).start()
+            poller.waiters += 1
+
+        if cancel_event is None:
+            poller.done.wait()
+            return poller.ready
+
+        while not poller.done.wait(0.05):
+            if cancel_event.is_set():
+                logger.info(f"Stopped waiting for search index '{index_name}' (cancelled).")
+                with self._index_pollers_lock:
+                    poller.waiters -= 1
+                    if poller.waiters == 0:
+                        poller.stop.set()
+                return False
+        return poller.ready
+
+    def _poll_index_ready(
+        self,
+        key: tuple,
+        poller: "_IndexPoller",
+        max_attempts: int,
+        wait_seconds: float,
+        max_wait_seconds: float,
+    ) -> None:
+        """
+        Background loop behind wait_for_index_ready; records the outcome on `poller`.
+        """
+        database_name, collection_name, index_name = key
+        try:
+            for attempt in range(1, max_attempts + 1):
+                if self.is_index_ready(database_name, collection_name, index_name):
+                    logger.info(f"Search index '{index_name}' is READY.")
+                    poller.ready = True
+                    return
+                if attempt == max_attempts:
+                    break
+                stopped = _wait_before_retry(
+                    attempt,
+                    f"Search index '{index_name}' not READY yet",
+                    wait_seconds,
+                    max_wait_seconds,
+                    sleep=poller.stop.wait,
+                )
+                if stopped:
+                    return
+            logger.error(f"Search index '{index_name}' did not reach READY status after {max_attempts} attempts.")
+        finally:
+            with self._index_pollers_lock:
+                # A cancelled poller may already have been replaced by a fresh one; leave that in place
+                if self._index_pollers.get(key) is poller:
+                    del self._index_pollers[key]
+            poller.done.set()
+
     def insert_documents(
         self,
         database_name: str,
         collection_name: str,
         documents: List[Dict[str, Any]],
         fields_to_embed: List[str],
+        batch_size: int = 256,
+        fast_insert: bool = False,
+        insert_batch_size: int = 1000,
+        max_workers: int = 8,
+        skip_if_populated: bool = True,
+        int8_copies: bool = False,
     ) -> None:
         """
         Inserts documents into the specified collection with embeddings for specified fields.
+        Texts are embedded in batches of `batch_size` when a get_embeddings function is available,
+        with up to `max_workers` batches requested concurrently.
+        Documents are embedded and written in groups of `insert_batch_size` (unordered insert_many
+        on a writer thread, overlapping the embedding of the next group); with `fast_insert=True`
+        the writes are unacknowledged (w=0) and server-side write failures are not reported.
+        Errors that stop the insert (e.g. an unreachable server) are logged and re-raised.
+        Each embedded text field gets a `{field}_sha1` hash next to its embedding.
+          - By default nothing is inserted if the collection already has data. With
+            `skip_if_populated=False` the documents are appended instead, and texts whose hash
+            is already stored reuse the stored embedding rather than being embedded again.
+          - With `int8_copies=True` each embedding also gets a `{field}_embedding_int8` copy
+            (see to_int8_bson_vector), a quarter of the float32 size, for fetching and
+            re-ranking candidates client-side with less data on the wire.
         """
         try:
             collection = self[database_name][collection_name]
-            existing_count = collection.count_documents({})
-            if existing_count > 0:
+            # Only "is there any document" matters: fetch at most one _id instead of counting them all
+            populated = collection.find_one({}, {"_id": 1}) is not None
+            if populated and skip_if_populated:
                 logger.info(f"Collection '{collection_name}' already has data. Skipping document insertion.")
                 return
 
             logger.info(f"Inserting documents into '{collection_name}'.")
 
-            documents_to_insert = []
+            # Hash every (doc, field) text up front so stored embeddings can be looked up in one pass
+            candidates = []
+            pending = []
             for doc in documents:
-                skip_doc = False
+                missing = [field for field in fields_to_embed if field not in doc]
+                if missing:
+                    logger.warning(
+                        f"Field '{missing[0]}' not found in document '{doc.get('name', 'Unnamed')}'. "
+                        "Skipping document."
+                    )
+                    continue
+                candidates.append(doc)
                 for field in fields_to_embed:
-                    if field in doc:
-                        embedding = self.get_embedding(doc[field])
-                        if embedding is None:
-                            logger.warning(
-                                f"Skipping document '{doc.get('name', 'Unnamed')}' "
-                                f"due to failed embedding for field '{field}'."
-                            )
-                            skip_doc = True
-                            break
-                        doc[f"{field}_embedding"] = embedding
-                    else:
-                        logger.warning(
-                            f"Field '{field}' not found in document '{doc.get('name', 'Unnamed')}'. "
-                            "Skipping document."
+                    if isinstance(doc[field], str):
+                        doc[f"{field}_sha1"] = hashlib.sha1(doc[field].encode("utf-8")).hexdigest()
+                    pending.append((doc, field))
+
+            # Embeddings already stored for identical texts (only possible when appending)
+            stored = {}
+            if populated:
+                for field in fields_to_embed:
+                    hashes = {doc[f"{field}_sha1"] for doc, f in pending if f == field and f"{field}_sha1" in doc}
+                    stored[field] = self._stored_embeddings(collection, field, hashes)
+                reused = sum(
+                    1 for doc, field in pending if doc.get(f"{field}_sha1") in stored.get(field, {})
+                )
+                logger.info(f"Reusing {reused} stored embedding(s) for unchanged texts.")
+
+            if fast_insert:
+                collection = collection.with_options(write_concern=WriteConcern(w=0))
+
+            # Embed and insert in groups of `insert_batch_size` documents: a writer thread inserts
+            # each group while the next one is embedded, so the embedding provider and the server
+            # are busy at the same time; at most INSERT_QUEUE_DEPTH embedded groups wait for it.
+            batches: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(maxsize=INSERT_QUEUE_DEPTH)
+            progress: Dict[str, Any] = {"sent": 0, "inserted": 0, "error": None}
+
+            def write_batches() -> None:
+                while True:
+                    batch = batches.get()
+                    if batch is None:
+                        return
+                    if progress["error"] is not None:
+                        continue  # keep draining so the embedding side never blocks
+                    progress["sent"] += len(batch)
+                    try:
+                        # No bypass_document_validation: PyMongo rejects it with the w=0 of fast_insert
+                        collection.insert_many(batch, ordered=False)
+                        progress["inserted"] += len(batch)
+                    except BulkWriteError as e:
+                        # Unordered: the rest of the batch was still written; report and move on
+                        write_errors = e.details.get("writeErrors", [])
+                        progress["inserted"] += e.details.get("nInserted", 0)
+                        logger.error(
+                            f"{len(write_errors)} document(s) failed to insert into '{collection_name}'. "
+                            f"First error: {write_errors[0].get('errmsg') if write_errors else e}"
                         )
-                        skip_doc = True
+                    except Exception as e:
+                        progress["error"] = e
+
+            writer = threading.Thread(target=write_batches, name="insert_documents-writer", daemon=True)
+            writer.start()
+            try:
+                for start in range(0, len(candidates), insert_batch_size):
+                    batch = self._embed_documents(
+                        candidates[start:start + insert_batch_size], fields_to_embed, stored,
+                        batch_size, max_workers, int8_copies,
+                    )
+                    if progress["error"] is not None:
                         break
-                if not skip_doc:
-                    documents_to_insert.append(doc)
+                    if batch:
+                        batches.put(batch)
+            finally:
+                batches.put(None)
+                writer.join()
+            if progress["error"] is not None:
+                raise progress["error"]
 
-            if documents_to_insert:
-                collection.insert_many(documents_to_insert)
-                logger.info(f"Inserted {len(documents_to_insert)} documents into '{collection_name}'.")
-            else:
+            if not progress["sent"]:
                 logger.warning("No documents were inserted due to embedding failures.")
+            elif fast_insert:
+                logger.info(f"Sent {progress['sent']} documents to '{collection_name}' (unacknowledged).")
+            else:
+                logger.info(f"Inserted {progress['inserted']} documents into '{collection_name}'.")
 
         except Exception as e:
             logger.error(f"Error inserting documents: {e}")
+            raise
+
+    def _embed_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        fields_to_embed: List[str],
+        stored: Dict[str, Dict[str, Any]],
+        batch_size: int,
+        max_workers: int,
+        int8_copies: bool,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sets the `{field}_embedding` fields of one group of insert_documents documents, reusing
+        `stored` embeddings (by text hash) where possible, and returns the documents to insert:
+        those whose embeddings all succeeded.
+        """
+        pending = [(doc, field) for doc in documents for field in fields_to_embed]
+        to_embed = [
+            (doc, field) for doc, field in pending
+            if doc.get(f"{field}_sha1") not in stored.get(field, {})
+        ]
+        embeddings = self._embed_texts(
+            [doc[field] for doc, field in to_embed],
+            batch_size=batch_size,
+            max_workers=max_workers,
+        )
+        fresh = {(id(doc), field): embedding for (doc, field), embedding in zip(to_embed, embeddings)}
+
+        skipped = set()
+        for doc, field in pending:
+            if id(doc) in skipped:
+                continue
+            if (id(doc), field) not in fresh:
+                doc[f"{field}_embedding"] = stored[field][doc[f"{field}_sha1"]]
+                if int8_copies:
+                    doc[f"{field}_embedding_int8"] = to_int8_bson_vector(doc[f"{field}_embedding"])
+                continue
+            embedding = fresh[(id(doc), field)]
+            if embedding is None:
+                logger.warning(
+                    f"Skipping document '{doc.get('name', 'Unnamed')}' "
+                    f"due to failed embedding for field '{field}'."
+                )
+                skipped.add(id(doc))
+                continue
+            doc[f"{field}_embedding"] = self._encode_vector(embedding)
+            if int8_copies:
+                doc[f"{field}_embedding_int8"] = to_int8_bson_vector(embedding)
+
+        return [doc for doc in documents if id(doc) not in skipped]
+
+    def _stored_embeddings(self, collection: Collection, field: str, hashes: set) -> Dict[str, Any]:
+        """
+        Returns {sha1: stored embedding} for documents whose `{field}_sha1` is in `hashes`,
+        using an index on the hash field (created on first use per collection and field, so
+        later ingests skip the round trip; a dropped index is not noticed).
+        """
+        hash_field = f"{field}_sha1"
+        embedding_field = f"{field}_embedding"
+        if not hashes:
+            return {}
+        index_key = (collection.database.name, collection.name, hash_field)
+        if index_key not in self._hash_indexes:
+            collection.create_index(hash_field)
+            self._hash_indexes.add(index_key)
+
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), 1000):
+            cursor = collection.find(
+                {hash_field: {"$in": hashes[start:start + 1000]}, embedding_field: {"$exists": True}},
+                {"_id": 0, hash_field: 1, embedding_field: 1},
+            )
+            for doc in cursor:
+                found.setdefault(doc[hash_field], doc[embedding_field])
+        return found
+
+    def _embed_texts(
+        self,
+        texts: List[str],
+        batch_size: int = 256,
+        max_workers: int = 8,
+    ) -> List[Optional[List[float]]]:
+        """
+        Embeds a list of texts, preferring the batched get_embeddings function
+        (one request per `batch_size` texts) and falling back to one get_embedding call per text.
+        When there are several requests, up to `max_workers` are kept in flight at once.
+        Identical texts are embedded only once. A failing batch is split in half and retried
+        (see _embed_chunk), so only texts that fail on their own come back as None.
+        """
+        if not texts:
+            return []
+
+        try:
+            unique_texts = list(dict.fromkeys(texts))
+        except TypeError:  # unhashable inputs (e.g. raw arrays) are embedded as given
+            unique_texts = texts
+        if len(unique_texts) < len(texts):
+            logger.debug(f"Embedding {len(unique_texts)} unique texts out of {len(texts)}.")
+            table = dict(zip(unique_texts, self._embed_texts(unique_texts, batch_size, max_workers)))
+            return [table[text] for text in texts]
+
+        if self.get_embeddings is None:
+            if len(texts) == 1 or max_workers <= 1:
+                return [self._embed_one(text) for text in texts]
+            # One request per text: overlap them on threads (executor.map keeps the order)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as executor:
+                return list(executor.map(self._embed_one, texts))
+
+        chunks = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        if len(chunks) == 1 or max_workers <= 1:
+            results = [self._embed_chunk(chunk) for chunk in chunks]
+        else:
+            # Embedding calls are network-bound, so threads overlap the round trips;
+            # executor.map keeps the results in chunk order.
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                results = list(executor.map(self._embed_chunk, chunks))
+
+        embeddings = []
+        for chunk_embeddings in results:
+            embeddings.extend(chunk_embeddings)
+        return embeddings
+
+    def _embed_one(self, text: str) -> Optional[List[float]]:
+        """
+        Embeds a single text with get_embedding; a failure is logged and returned as None.
+        Rate-limited requests are retried with backoff first.
+        """
+        try:
+            return with_backoff(self.get_embedding, text)
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            return None
+
+    def _embed_chunk(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embeds one batch with get_embeddings. If the call fails (e.g. the request is too large
+        or one text is rejected), the batch is bisected and each half retried, so a single bad
+        text costs O(log n) extra requests instead of the whole batch; a text that still
+        fails on its own is returned as None. Rate-limited requests are retried with backoff
+        before any split.
+        """
+        try:
+            return with_backoff(self.get_embeddings, texts)
+        except Exception as e:
+            if len(texts) == 1:
+                logger.error(f"Error generating embedding: {e}")
+                return [None]
+            logger.warning(f"Embedding batch of {len(texts)} failed ({e}). Retrying in halves.")
+            middle = len(texts) // 2
+            return self._embed_chunk(texts[:middle]) + self._embed_chunk(texts[middle:])
+
+    def _resolve_query_embedding(
+        self,
+        query: Union[str, List[float], np.ndarray]
+    ) -> Optional[Union[List[float], np.ndarray]]:
+        """
+        Embeds a string query; lists, tuples and ndarrays are assumed to already be embeddings.
+        String queries are served from a small LRU when they were embedded recently.
+        """
+        if not isinstance(query, str):
+            return query
+        if self.query_cache_size <= 0:
+            return self.get_embedding(query)
+
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(query)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return embedding
+
+        embedding = self.get_embedding(query)
+        if embedding is not None:
+            # Kept as packed float32, not a list of boxed Python floats
+            embedding = np.asarray(embedding, dtype=np.float32).ravel()
+            with self._query_embeddings_lock:
+                self._query_embeddings[query] = embedding
+                while len(self._query_embeddings) > self.query_cache_size:
+                    self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def _encode_vector(self, embedding: Sequence[float]) -> Union[List[float], Binary]:
+        """
+        Returns an embedding in the form sent to the server, both for stored embedding
+        fields and for $vectorSearch.queryVector.
+        """
+        if self.normalize_embeddings:
+            vector = np.asarray(embedding, dtype=np.float32).ravel()
+            norm = np.linalg.norm(vector)
+            embedding = vector / norm if norm > 0 else vector
+        if self.bson_vectors:
+            return to_bson_vector(embedding)
+        if isinstance(embedding, np.ndarray):
+            return embedding.tolist()
+        return embedding
 
     def vector_search(
         self,
-        query: Union[str, List[float]],
+        query: Union[str, List[float], np.ndarray],
         limit: int = 5,
         database_name: str = "",
         collection_name: str = "",
         index_name: str = "",
         embedding_field: str = "embedding",
         filters: Optional[Dict[str, Any]] = None,
-    ) -> List[Dict]:
+        stream: bool = False,
+        num_candidates: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Union[List[Dict], CommandCursor]:
         """
         Performs a vector-based search using the specified search index.
           - If `query` is a string, we call self.get_embedding(query).
-          - If `query` is a list/tuple, we assume it's already the embedding.
+          - If `query` is a list/tuple/ndarray, we assume it's already the embedding.
+          - `filters` (an MQL predicate) is applied inside $vectorSearch as a pre-filter; the
+            fields it references must be declared via `filter_fields` in _create_search_index.
+          - `num_candidates` is how many nearest neighbours $vectorSearch considers; more means
+            better recall at slightly higher latency (default: see _default_num_candidates).
+          - `fields` limits the returned documents to those fields (plus _id and score);
+            by default every field except the embedding is returned.
+          - If `stream` is True, the aggregation cursor is returned instead of a list so
+            results can be consumed as they arrive (in batches of at most STREAM_BATCH_SIZE);
+            each document already carries its `score`, so consumers can stop early.
+            Exhaust or close the cursor to free it on the server.
         """
-        # Determine query embedding
-        if isinstance(query, str):
-            query_embedding = self.get_embedding(query)
-        elif isinstance(query, (list, tuple)):
-            query_embedding = query  # assume user supplied embedding
-        else:
+        if not isinstance(query, (str, list, tuple, np.ndarray)):
             logger.error(f"Query type {type(query)} not supported for vector search.")
             return []
 
-        if not self.index_exists(database_name, collection_name, index_name):
-            logger.error(f"Index '{index_name}' does not exist.")
-            return []
+        query_embedding = self._resolve_query_embedding(query)
         if query_embedding is None:
             logger.error(f"Failed to generate or receive embedding for query: {query}")
             return []
 
+        cache_key = (
+            database_name, collection_name, index_name, embedding_field, limit,
+            repr(filters), num_candidates, tuple(fields or ()),
+        )
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(cache_key, query_embedding)
+            if cached is not None:
+                logger.info(f"Vector search served from semantic cache. Found {len(cached)} documents.")
+                return cached
+
         try:
             collection = self[database_name][collection_name]
-            pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": index_name,
-                        "limit": limit,
-                        "numCandidates": limit,
-                        "queryVector": query_embedding,
-                        "path": str(embedding_field),
-                    }
-                },
-                {"$set": {"score": {"$meta": "vectorSearchScore"}}},
-                {"$project": {str(embedding_field): 0}},
-            ]
-            results = list(collection.aggregate(pipeline))
+            pipeline = self._vector_search_pipeline(
+                query_embedding, limit, index_name, embedding_field, filters, num_candidates, fields
+            )
+            cursor = collection.aggregate(pipeline, batchSize=min(limit, STREAM_BATCH_SIZE) if stream else limit)
+            if stream:
+                return cursor
+            results = list(cursor)
+            self._check_search_index(database_name, collection_name, index_name, found=bool(results))
             logger.info(f"Vector search completed. Found {len(results)} documents.")
+            if results and self.semantic_cache is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
             return results
         except Exception as e:
             logger.error(f"Error during vector search: {e}")
             return []
 
+    def _vector_search_pipeline(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        limit: int,
+        index_name: str,
+        embedding_field: str,
+        filters: Optional[Dict[str, Any]],
+        num_candidates: Optional[int],
+        fields: Optional[List[str]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Builds the vector_search aggregation pipeline (shared by vector_search_async).
+        """
+        return [
+            {
+                "$vectorSearch": {
+                    "index": index_name,
+                    "limit": limit,
+                    "numCandidates": num_candidates or _default_num_candidates(limit),
+                    "queryVector": self._encode_vector(query_embedding),
+                    "path": str(embedding_field),
+                    **({"filter": filters} if filters else {}),
+                }
+            },
+            # Drop the embedding as early as possible so later stages and the wire carry less
+            *_search_projection(fields, embedding_field, "vectorSearchScore"),
+        ]
+
+    @asynccontextmanager
+    async def _async_client(self):
+        """
+        Yields a pymongo AsyncMongoClient built from this client's arguments and closes it on exit.
+        An AsyncMongoClient is bound to the event loop it is used on (and each asyncio.run() is a
+        new loop), so one is scoped to each vector_search_async / vector_search_many call rather
+        than cached; it keeps no idle connections (minPoolSize=0) since it is short-lived.
+        """
+        from pymongo import AsyncMongoClient
+
+        args, kwargs = self._client_args
+        client = AsyncMongoClient(*args, **{**kwargs, "minPoolSize": 0})
+        try:
+            yield client
+        finally:
+            await client.close()
+
+    async def vector_search_async(
+        self,
+        query: Union[str, List[float], np.ndarray],
+        limit: int = 5,
+        database_name: str = "",
+        collection_name: str = "",
+        index_name: str = "",
+        embedding_field: str = "embedding",
+        filters: Optional[Dict[str, Any]] = None,
+        num_candidates: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Asynchronous vector_search (same arguments, except `stream`), for use inside an event loop.
+        The aggregate runs on a pymongo AsyncMongoClient opened for this call, so many searches can
+        be awaited together (see vector_search_many, which shares one client among them) without a
+        thread each; embedding a string query runs in a worker thread since get_embedding is
+        synchronous. Shares the query and semantic caches.
+        """
+        async with self._async_client() as client:
+            return await self._vector_search_on(
+                client, query, limit, database_name, collection_name, index_name,
+                embedding_field, filters, num_candidates, fields,
+            )
+
+    async def _vector_search_on(
+        self,
+        client,
+        query: Union[str, List[float], np.ndarray],
+        limit: int = 5,
+        database_name: str = "",
+        collection_name: str = "",
+        index_name: str = "",
+        embedding_field: str = "embedding",
+        filters: Optional[Dict[str, Any]] = None,
+        num_candidates: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Body of vector_search_async, running the aggregate on the AsyncMongoClient `client`.
+        """
+        if not isinstance(query, (str, list, tuple, np.ndarray)):
+            logger.error(f"Query type {type(query)} not supported for vector search.")
+            return []
+
+        query_embedding = await asyncio.to_thread(self._resolve_query_embedding, query)
+        if query_embedding is None:
+            logger.error(f"Failed to generate or receive embedding for query: {query}")
+            return []
+
+        cache_key = (
+            database_name, collection_name, index_name, embedding_field, limit,
+            repr(filters), num_candidates, tuple(fields or ()),
+        )
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(cache_key, query_embedding)
+            if cached is not None:
+                logger.info(f"Vector search served from semantic cache. Found {len(cached)} documents.")
+                return cached
+
+        try:
+            collection = client[database_name][collection_name]
+            pipeline = self._vector_search_pipeline(
+                query_embedding, limit, index_name, embedding_field, filters, num_candidates, fields
+            )
+            cursor = await collection.aggregate(pipeline, batchSize=limit)
+            results = await cursor.to_list(None)
+            if results:
+                self._mark_index_seen(database_name, collection_name, index_name)
+            else:
+                await asyncio.to_thread(self._check_search_index, database_name, collection_name, index_name, False)
+            logger.info(f"Vector search completed. Found {len(results)} documents.")
+            if results and self.semantic_cache is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
+            return results
+        except PyMongoError as e:
+            # Only server/driver errors become an empty result; misuse (e.g. loop errors) propagates
+            logger.error(f"Error during vector search: {e}")
+            return []
+
+    async def vector_search_many(
+        self,
+        queries: List[Union[str, List[float], np.ndarray]],
+        **kwargs
+    ) -> List[List[Dict]]:
+        """
+        Runs vector_search_async for every query concurrently, over one AsyncMongoClient that is
+        closed when all are done; results are in query order.
+        Keyword arguments are passed to each search. Repeated string queries are embedded and
+        searched once (run concurrently, they would all miss the query cache) and each
+        occurrence gets its own copy of the results.
+        """
+        # Strings are keyed by value; embeddings (unhashable) by position, so they never merge
+        keys = [query if isinstance(query, str) else position for position, query in enumerate(queries)]
+        distinct = dict(zip(keys, queries))
+        if len(distinct) < len(keys):
+            logger.debug(f"Running {len(distinct)} distinct searches for {len(keys)} queries.")
+        async with self._async_client() as client:
+            results = await asyncio.gather(
+                *(self._vector_search_on(client, query, **kwargs) for query in distinct.values())
+            )
+        by_key = dict(zip(distinct, results))
+        return [[dict(doc) for doc in by_key[key]] for key in keys]
+
     def keyword_search(
         self,
         query: str,
         limit: int = 5,
         database_name: str = "",
         collection_name: str = "",
+        search_index_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
     ) -> List[Dict]:
         """
-        Performs a keyword-based search using a regular expression.
+        Performs a keyword-based search using the text index on 'content', sorted by text score.
+        Falls back to a case-insensitive literal match when the collection has no text index.
+          - If `search_index_name` is given, an Atlas Search $search 'text' query against that
+            index is used instead, ranked by search score (create it with _create_text_search_index).
+            $search on a missing index returns nothing rather than failing, so when it comes back
+            empty and the index does not exist, the text-index / literal-match path is used.
+          - `fields` limits the returned documents to those fields (plus _id and score).
         """
+        # Include-list when fields are given, otherwise exclude the embedding (and its int8 copy)
+        projection = _result_projection(fields, "embedding")
         try:
             collection = self[database_name][collection_name]
-            cursor = collection.find(
-                {"content": {"$regex": query, "$options": "i"}},
-                {"embedding": 0}  # Exclude the embedding from the results
-            ).limit(limit)
-            results = list(cursor)
+            if search_index_name:
+                pipeline = [
+                    {
+                        "$search": {
+                            "index": search_index_name,
+                            "text": {"query": query, "path": "content"},
+                        }
+                    },
+                    {"$limit": limit},
+                    *_search_projection(fields, "embedding", "searchScore"),
+                ]
+                results = list(collection.aggregate(pipeline, batchSize=limit))
+                if results or self.index_exists(database_name, collection_name, search_index_name):
+                    if results:
+                        self._mark_index_seen(database_name, collection_name, search_index_name)
+                    logger.info(f"Keyword search completed. Found {len(results)} documents.")
+                    return results
+                logger.warning(
+                    f"Search index '{search_index_name}' not found on '{collection_name}'. "
+                    f"Falling back to text index keyword search."
+                )
+
+            # Collections recently found to lack a text index go straight to the regex fallback
+            text_key = (database_name, collection_name)
+            missing_at = self._no_text_index_cache.get(text_key)
+            results = None
+            if missing_at is None or time.monotonic() - missing_at >= self.index_cache_ttl:
+                try:
+                    cursor = collection.find(
+                        {"$text": {"$search": query}},
+                        {**projection, "score": {"$meta": "textScore"}}
+                    ).sort([("score", {"$meta": "textScore"})]).limit(limit).batch_size(limit)
+                    results = list(cursor)
+                except OperationFailure as e:
+                    if e.code != 27:  # IndexNotFound
+                        raise
+                    logger.info(f"No text index on '{collection_name}'. Falling back to regex keyword search.")
+                    self._no_text_index_cache[text_key] = time.monotonic()
+            if results is None:
+                cursor = collection.find(
+                    {"content": _keyword_regex(query)},
+                    projection
+                ).limit(limit).batch_size(limit)
+                results = list(cursor)
             logger.info(f"Keyword search completed. Found {len(results)} documents.")
             return results
         except Exception as e:
@@ -453,56 +1607,221 @@ class CustomMongoClient(MongoClient):
 
     def hybrid_search(
         self,
-        query: Union[str, List[float]],
+        query: Union[str, List[float], np.ndarray],
         keyword: str,
         limit: int = 5,
         database_name: str = "",
         collection_name: str = "",
         index_name: str = "",
         distance_metric: str = "cosine",
-    ) -> List[Dict]:
+        stream: bool = False,
+        search_index_name: Optional[str] = None,
+        rrf_k: int = 60,
+        filters: Optional[Dict[str, Any]] = None,
+        keyword_overfetch: int = 10,
+        fields: Optional[List[str]] = None,
+        num_candidates: Optional[int] = None,
+    ) -> Union[List[Dict], CommandCursor]:
         """
         Performs a hybrid search combining vector-based search and keyword filtering.
         Returns documents that are semantically relevant AND match the keyword.
           - If `query` is a string, we call self.get_embedding(query).
-          - If `query` is a list/tuple, we assume it's already the embedding.
+          - If `query` is a list/tuple/ndarray, we assume it's already the embedding.
+          - If `stream` is True, the aggregation cursor is returned instead of a list.
+          - `filters` (an MQL predicate on `filter_fields`) is applied inside $vectorSearch,
+            as in vector_search; it narrows the candidates before the keyword match (and
+            restricts both rankings when `search_index_name` is given).
+          - The keyword match runs after $vectorSearch (regexes cannot go in its filter), so
+            limit * `keyword_overfetch` nearest documents are matched server-side to still
+            find `limit` hits; only the final `limit` documents are sent back.
+          - `fields` limits the returned documents to those fields (plus _id and score).
+          - `num_candidates` is how many nearest neighbours $vectorSearch considers, as in
+            vector_search (default: derived from the number of vector results fetched).
+          - If `search_index_name` is given, the vector results and an Atlas Search $search on
+            `keyword` are instead merged with Reciprocal Rank Fusion (score = sum of
+            1 / (rrf_k + rank)), returning documents that rank well in EITHER search.
+            Both searches run in one aggregate; `stream` does not apply.
         """
-        if isinstance(query, str):
-            query_embedding = self.get_embedding(query)
-        elif isinstance(query, (list, tuple)):
-            query_embedding = query
-        else:
+        if not isinstance(query, (str, list, tuple, np.ndarray)):
             logger.error(f"Query type {type(query)} not supported for hybrid search.")
             return []
 
-        if not self.index_exists(database_name, collection_name, index_name):
-            logger.error(f"Index '{index_name}' does not exist.")
-            return []
+        query_embedding = self._resolve_query_embedding(query)
         if query_embedding is None:
             logger.error(f"Failed to generate or receive embedding for query: {query}")
             return []
 
+        cache_key = (
+            "hybrid", database_name, collection_name, index_name, keyword, limit,
+            search_index_name, rrf_k, repr(filters), keyword_overfetch, tuple(fields or ()), num_candidates,
+        )
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(cache_key, query_embedding)
+            if cached is not None:
+                logger.info(f"Hybrid search served from semantic cache. Found {len(cached)} documents.")
+                return cached
+
+        if search_index_name:
+            results = self._rank_fusion_search(
+                query_embedding, keyword, limit, database_name, collection_name,
+                index_name, search_index_name, rrf_k, fields, filters, num_candidates,
+            )
+            if results and self.semantic_cache is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
+            return results
+
         try:
             collection = self[database_name][collection_name]
             pipeline = [
                 {
                     "$vectorSearch": {
                         "index": index_name,
-                        "limit": limit * 2,  # fetch more to account for filtering
-                        "numCandidates": limit * 2,
-                        "queryVector": query_embedding,
+                        "limit": limit * keyword_overfetch,  # fetch more to account for filtering
+                        "numCandidates": num_candidates or _default_num_candidates(limit * keyword_overfetch),
+                        "queryVector": self._encode_vector(query_embedding),
                         "path": "embedding",
+                        **({"filter": filters} if filters else {}),
                     }
                 },
-                {"$set": {"score": {"$meta": "vectorSearchScore"}}},
-                {"$match": {"content": {"$regex": keyword, "$options": "i"}}},
+                # Drop the embedding before the regex $match so it scans smaller documents
+                # ('content' is kept for the $match even when not requested in `fields`)
+                *_search_projection(fields and ["content", *fields], "embedding", "vectorSearchScore"),
+                {"$match": {"content": _keyword_regex(keyword)}},
                 {"$sort": {"score": -1}},  # sort by relevance score
                 {"$limit": limit},
-                {"$project": {"embedding": 0}},
             ]
-            results = list(collection.aggregate(pipeline))
+            if fields and "content" not in fields:
+                pipeline.append({"$project": {"content": 0}})
+            cursor = collection.aggregate(pipeline, batchSize=min(limit, STREAM_BATCH_SIZE) if stream else limit)
+            if stream:
+                return cursor
+            results = list(cursor)
+            self._check_search_index(database_name, collection_name, index_name, found=bool(results))
             logger.info(f"Hybrid search completed. Found {len(results)} documents.")
+            if results and self.semantic_cache is not None:
+                self.semantic_cache.add(cache_key, query_embedding, results)
             return results
         except Exception as e:
             logger.error(f"Error during hybrid search: {e}")
             return []
+
+    def _rank_fusion_search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        keyword: str,
+        limit: int,
+        database_name: str,
+        collection_name: str,
+        index_name: str,
+        search_index_name: str,
+        rrf_k: int,
+        fields: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        num_candidates: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Runs $vectorSearch and a $search 'text' query in a single aggregate and fuses the two
+        rankings with Reciprocal Rank Fusion.
+        $vectorSearch and $search cannot run inside $facet, so the keyword branch is attached
+        with $unionWith; each branch numbers its own hits so the ranks survive the union.
+        `filters` is a pre-filter inside $vectorSearch and a $match on the $search hits
+        (before their $limit), so both branches rank the same subset of the collection.
+        """
+        def ranked() -> List[Dict[str, Any]]:
+            # Collapse the branch into one array and unwind it again to get each hit's 0-based rank
+            return [
+                {"$limit": limit},
+                {"$project": _result_projection(fields, "embedding")},
+                {"$group": {"_id": None, "docs": {"$push": "$$ROOT"}}},
+                {"$unwind": {"path": "$docs", "includeArrayIndex": "rank"}},
+                {"$replaceWith": {"$mergeObjects": ["$docs", {"_rank": "$rank"}]}},
+            ]
+
+        try:
+            collection = self[database_name][collection_name]
+            pipeline = [
+                {
+                    "$vectorSearch": {
+                        "index": index_name,
+                        "limit": limit,
+                        "numCandidates": num_candidates or _default_num_candidates(limit),
+                        "queryVector": self._encode_vector(query_embedding),
+                        "path": "embedding",
+                        **({"filter": filters} if filters else {}),
+                    }
+                },
+                *ranked(),
+                {
+                    "$unionWith": {
+                        "coll": collection_name,
+                        "pipeline": [
+                            {
+                                "$search": {
+                                    "index": search_index_name,
+                                    "text": {"query": keyword, "path": "content"},
+                                }
+                            },
+                            *([{"$match": filters}] if filters else []),
+                            *ranked(),
+                        ],
+                    }
+                },
+            ]
+
+            scores: Dict[Any, float] = defaultdict(float)
+            docs: Dict[Any, Dict[str, Any]] = {}
+            # Each branch contributes at most `limit` hits, so one batch holds the whole result
+            for doc in collection.aggregate(pipeline, batchSize=limit * 2):
+                rank = doc.pop("_rank")
+                scores[doc["_id"]] += 1.0 / (rrf_k + rank + 1)
+                docs.setdefault(doc["_id"], doc)
+
+            results = []
+            for doc_id in sorted(scores, key=scores.get, reverse=True)[:limit]:
+                doc = docs[doc_id]
+                doc["score"] = scores[doc_id]
+                results.append(doc)
+            self._check_search_index(database_name, collection_name, index_name, found=bool(results))
+            logger.info(f"Hybrid search (rank fusion) completed. Found {len(results)} documents.")
+            return results
+        except Exception as e:
+            logger.error(f"Error during hybrid search: {e}")
+            return []
+
+    def rerank(
+        self,
+        candidates: List[Dict[str, Any]],
+        query: Union[str, List[float], np.ndarray],
+        k: Optional[int] = None,
+        embedding_field: str = "embedding",
+    ) -> List[Dict[str, Any]]:
+        """
+        Re-ranks search results client-side by cosine similarity between `query` and each
+        candidate's `embedding_field` (e.g. a second embedding or an int8 copy requested via
+        `fields`), and
+        returns the top `k` (default: all) with the similarity in "rerank_score".
+        Candidates without a usable embedding are dropped. Uses the numba kernel when installed.
+        """
+        query_embedding = self._resolve_query_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Failed to generate or receive embedding for query: {query}")
+            return []
+
+        kept, vectors = [], []
+        for doc in candidates:
+            vector = doc.get(embedding_field)
+            if isinstance(vector, Binary):
+                vector = vector.as_vector().data
+            if vector is None or len(vector) != len(query_embedding):
+                continue
+            kept.append(doc)
+            vectors.append(vector)
+        if not kept:
+            return []
+
+        results = []
+        for row, score in cosine_topk(np.asarray(vectors, dtype=np.float32), np.asarray(query_embedding), k or len(kept)):
+            doc = dict(kept[row])
+            doc["rerank_score"] = score
+            results.append(doc)
+        return results
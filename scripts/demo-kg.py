@@ -13,9 +13,9 @@ def dummy_embedding(text: str):
     Returns a simple numeric vector of length 5.
     For instance, each element is just float(len(text)).
     This is purely for demonstration, not for real semantic search.
+    An immutable tuple is returned, which the client accepts like a list.
     """
-    length = float(len(text))
-    return [length, length, length, length, length]
+    return (float(len(text)),) * 5
 
 def main():
     # Setup logging for our demo
@@ -62,7 +62,8 @@ def main():
     related_to_alice = client.kg.find_related_nodes(
         start_node_id="Alice",
         db_name=KG_DB,
-        collection_name=KG_COLL
+        collection_name=KG_COLL,
+        max_depth=3,
     )
     print("\n--- Knowledge Graph: find_related_nodes('Alice') ---")
     print(related_to_alice)
@@ -73,6 +74,7 @@ def main():
     DOCS_DB = "demo_db"
     DOCS_COLL = "demo_docs"
     INDEX_NAME = "demo_index"
+    SEARCH_INDEX_NAME = "demo_text_index"
 
     # Example documents
     my_documents = [
@@ -97,11 +99,18 @@ def main():
         distance_metric="cosine"
     )
 
-    # Wait for index to be ready
-    client.wait_for_index_ready(
+    # Atlas Search index on 'content' for keyword search (inverted index instead of a scan)
+    client._create_text_search_index(
         database_name=DOCS_DB,
         collection_name=DOCS_COLL,
-        index_name=INDEX_NAME,
+        index_name=SEARCH_INDEX_NAME
+    )
+
+    # Wait for both indexes to be ready (one status call per poll for the two)
+    client.wait_for_indexes_ready(
+        database_name=DOCS_DB,
+        collection_name=DOCS_COLL,
+        index_names=[INDEX_NAME, SEARCH_INDEX_NAME],
         max_attempts=5,
         wait_seconds=1
     )
@@ -140,10 +149,11 @@ def main():
     # ----------------------------------------------------------------
     print("\n--- Keyword Search ---")
     results_keyword = client.keyword_search(
-        query="co-workers",  # regex-based match in 'content' field
+        query="co-workers",  # $search 'text' query on the analyzed 'content' field
         limit=2,
         database_name=DOCS_DB,
-        collection_name=DOCS_COLL
+        collection_name=DOCS_COLL,
+        search_index_name=SEARCH_INDEX_NAME
     )
     for doc in results_keyword:
         print(doc)
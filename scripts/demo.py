@@ -1,24 +1,122 @@
+import base64
 import logging
+import numpy as np
 import openai
+from functools import lru_cache
 from typing import List
 
-# load .ENV file
 from dotenv import load_dotenv
-load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Get Embedding Function
-def get_embedding(text: str, model: str = "text-embedding-3-small", dimensions: int = 256) -> List[float]:
-    text = text.replace("\n", " ")
+# Build the OpenAI client once; it holds the HTTP connection pool reused across calls
+@lru_cache(maxsize=1)
+def _openai_client() -> openai.OpenAI:
+    return openai.OpenAI()
+
+# Maximum number of inputs the embeddings endpoint accepts per request
+OPENAI_MAX_INPUTS = 2048
+
+# Batched Embedding Function (one request per list of texts, up to OPENAI_MAX_INPUTS each).
+# Embeddings are requested base64-encoded, i.e. as packed float32 bytes, and decoded straight
+# into numpy arrays instead of parsing a JSON array of floats per text.
+def get_embeddings(texts: List[str], model: str = "text-embedding-3-small", dimensions: int = 256) -> List[np.ndarray]:
+    texts = [text.replace("\n", " ") for text in texts]
     try:
-        return openai.OpenAI().embeddings.create(input=[text], model=model, dimensions=dimensions).data[0].embedding
+        embeddings = []
+        for start in range(0, len(texts), OPENAI_MAX_INPUTS):
+            response = _openai_client().embeddings.create(
+                input=texts[start:start + OPENAI_MAX_INPUTS],
+                model=model,
+                dimensions=dimensions,
+                encoding_format="base64",
+            )
+            embeddings.extend(np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32) for item in response.data)
+        return embeddings
     except Exception as e:
-        logger.error(f"Error generating embedding: {str(e)}")
+        logger.error(f"Error generating embeddings: {str(e)}")
         raise
 
-## Example usage
-from mdb_toolkit import CustomMongoClient
-print("mdb_toolkit package imported successfully")
\ No newline at end of file
+# Get Embedding Function
+def get_embedding(text: str, model: str = "text-embedding-3-small", dimensions: int = 256) -> np.ndarray:
+    return get_embeddings([text], model=model, dimensions=dimensions)[0]
+
+# Example usage
+from mdb_toolkit import CustomMongoClient, CachedEmbedder
+
+
+def main():
+    # load .ENV file and set up logging here, when run as a script, rather than on import
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    print("mdb_toolkit package imported successfully")
+
+    # Cache embeddings in memory and on disk so repeated texts (and re-runs) skip the API
+    embedder = CachedEmbedder(
+        get_embedding,
+        get_embeddings,
+        model="text-embedding-3-small",
+        dimensions=256,
+    )
+
+    # Define database and collection names
+    database_name = "test_database"
+    collection_name = "test_collection"
+    index_name = "vs_openai"
+
+    client = CustomMongoClient(
+        "mongodb://localhost:27017/?directConnection=true&serverSelectionTimeoutMS=2000",
+        get_embedding=embedder.get_embedding,
+        get_embeddings=embedder.get_embeddings,
+    )
+    client._create_search_index(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        distance_metric="cosine",
+        embedding_field="content_embedding",
+        num_dimensions=256,  # matches `dimensions` above, so no probe embedding is needed
+    )
+    if not client.wait_for_index_ready(database_name, collection_name, index_name):
+        logger.error("Index creation process exceeded wait limit or failed.")
+        return
+
+    documents = [
+        {"_id": 0, "content": "Photosynthesis in plants converts light energy into glucose and produces essential oxygen."},
+        {"_id": 1, "content": "Rivers provide water, irrigation, and habitat for aquatic species, vital for ecosystems."},
+        {"_id": 2, "content": "Shakespeare's works, like 'Hamlet' and 'A Midsummer Night's Dream,' endure in literature."},
+    ]
+    client.insert_documents(
+        database_name=database_name,
+        collection_name=collection_name,
+        documents=documents,
+        fields_to_embed=["content"],
+    )
+    client.wait_for_indexing(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        min_docs=len(documents),
+        embedding_field="content_embedding",
+    )
+
+    query = "How do plants make oxygen?"
+    print("\n--- Vector-Based Search Results ---")
+    for doc in client.vector_search(
+        query=query,
+        limit=2,
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        embedding_field="content_embedding",
+        fields=["content"],
+    ):
+        print(f"ID: {doc.get('_id')}\nContent: {doc.get('content')}\nScore: {doc.get('score')}\n")
+
+    client.close()
+    embedder.close()
+
+
+if __name__ == "__main__":
+    main()
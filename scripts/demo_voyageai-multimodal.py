@@ -1,31 +1,60 @@
 import logging
-import openai
-from typing import List
+import os
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
 
-# load .ENV file
 from dotenv import load_dotenv
-load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 import voyageai
 voyageai_api_key = "pa-"
 vo = voyageai.Client(api_key=voyageai_api_key)
 MODEL_NAME = "voyage-multimodal-3"
+# Maximum number of pages sent in a single multimodal_embed request; full-page renders are
+# several thousand tokens each, so small requests also stay under the per-request token limit
+EMBED_BATCH = 16
+# Requests (one per render window) in flight at once
+EMBED_WORKERS = 8
 
 import requests
-from pdf2image import convert_from_bytes
-
-def pdf_url_to_screenshots(url: str) -> list[any]:
-    """Extract all pages as screenshots from a PDF."""
-
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for bad responses
-
-    images = convert_from_bytes(response.content)
-    return images
+from mdb_toolkit import with_backoff
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+# Pages rasterized at a time: one embedding request's worth. Windows are rendered only as
+# workers free up, so at most EMBED_WORKERS windows of page images exist at once
+RENDER_WINDOW = EMBED_BATCH
+# Longest side, in pixels, pages are rendered at (as mdb_toolkit's InputHandler does);
+# pdf2image's default 200 dpi would make a letter page ~11MB of RGB
+TARGET_RENDER_PX = 1024
+
+def _render_dpi(pdf_info: dict) -> int:
+    # dpi that renders the longest side of the (first) page at TARGET_RENDER_PX
+    match = re.match(r"([\d.]+) x ([\d.]+) pts", pdf_info.get("Page size", ""))
+    longest_pts = max(float(match.group(1)), float(match.group(2))) if match else 792.0  # letter
+    return max(1, round(TARGET_RENDER_PX * 72 / longest_pts))
+
+def pdf_url_to_screenshots(url: str) -> Iterator[list[any]]:
+    """Yield the pages of a PDF as screenshots, RENDER_WINDOW pages at a time."""
+
+    # A directory rather than an open NamedTemporaryFile, so poppler can reopen the file by
+    # path on every platform (Windows can't open a file that is still held open)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "input.pdf")
+        # Stream the download to disk instead of holding the whole PDF in memory
+        with requests.get(url, stream=True) as response, open(pdf_path, "wb") as pdf_file:
+            response.raise_for_status()  # Raise an exception for bad responses
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                pdf_file.write(chunk)
+
+        info = pdfinfo_from_path(pdf_path)
+        page_count, dpi = info["Pages"], _render_dpi(info)
+        for first_page in range(1, page_count + 1, RENDER_WINDOW):
+            last_page = min(first_page + RENDER_WINDOW - 1, page_count)
+            yield convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
 
 # Get Embedding Function
 def get_embedding(text: any) -> List[float]:
@@ -38,83 +67,141 @@ def get_embedding(text: any) -> List[float]:
         logger.error(f"Error generating embedding: {str(e)}")
         raise
 
-# Example usage
-from mdb_toolkit import CustomMongoClient
-print("mdb_toolkit package imported successfully")
-
-# Define database and collection names
-database_name = "test_database"
-collection_name = "test_collection"
-index_name = "vs_1"  # Ensure this matches your intended index name
-distance_metric = "cosine"
-
-client = CustomMongoClient(
-    "mongodb://localhost:27017/?directConnection=true&serverSelectionTimeoutMS=2000",
-    get_embedding=get_embedding
-)
-# Create the search index
-client._create_search_index(
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    distance_metric=distance_metric,
-    embedding_field="content_embedding", #voyageai :)
-)
-
-# Wait for the search index to be READY
-logger.info("Waiting for the search index to be READY...")
-index_ready = client.wait_for_index_ready(
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    max_attempts=10,
-    wait_seconds=1
-)
-
-if index_ready:
-    logger.info(f"Search index '{index_name}' is now READY and available!")
-    print("Index is ready!")
-else:
-    logger.error("Index creation process exceeded wait limit or failed.")
-    print("Index creation process exceeded wait limit.")
-    exit()
-
-# Insert documents
-pdf_url = "https://www.fdrlibrary.org/documents/356632/390886/readingcopy.pdf"
-document_images = pdf_url_to_screenshots(pdf_url)
-
-# turn those documents into objects with _id and content
-documents = [
-    {"_id": i, "content": doc} for i, doc in enumerate(document_images)
-]
-# Insert documents into the collection
-for doc in documents:
-    doc["content_embedding"] = get_embedding(doc["content"])
-    doc["content"] = str(doc["content"])
-    client[database_name][collection_name].insert_one(doc)
-
-print("Inserted documents into the collection.")
-
-# insert pause to allow index update
-import time
-time.sleep(5)
-print("Searching for documents...")
-# Perform searches
-# 1. Vector-Based Search
-query = "The consequences of a dictator's peace"
-logger.info(f"Performing vector-based search with query: '{query}'")
-vector_results = client.vector_search(
-    query=query,
-    limit=3,
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    embedding_field="content_embedding", #voyageai :)
-)
-print("\n--- Vector-Based Search Results ---")
-for doc in vector_results:
-    print(f"ID: {doc.get('_id')}\nContent: {doc.get('content')}\nMeta Data: {doc.get('meta_data')}\nScore: {doc.get('score')}\n")
+# One multimodal_embed request, retried with exponential backoff + jitter when rate limited
+def embed_batch(images: List[any]) -> List[List[float]]:
+    return with_backoff(
+        vo.multimodal_embed, [[image] for image in images], model=MODEL_NAME, input_type="document"
+    ).embeddings
 
+# Batched Embedding Function (one request per EMBED_BATCH images); concurrency comes from
+# embedding several render windows at once (see main)
+def get_embeddings(images: List[any]) -> List[List[float]]:
+    try:
+        embeddings = []
+        for start in range(0, len(images), EMBED_BATCH):
+            embeddings.extend(embed_batch(images[start:start + EMBED_BATCH]))
+        return embeddings
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {str(e)}")
+        raise
+
+# Example usage
+from mdb_toolkit import CustomMongoClient, CachedEmbedder, to_bson_vector
+
+
+def main():
+    # load .ENV file and set up logging here, when run as a script, rather than on import
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    print("mdb_toolkit package imported successfully")
+
+    # Keep page embeddings on disk, keyed by the rendered pixels, so re-running the demo on the
+    # same PDF does not call Voyage again
+    embedder = CachedEmbedder(
+        get_embedding,
+        get_embeddings,
+        model=MODEL_NAME,
+        key=lambda image: f"{image.mode}{image.size}".encode("utf-8") + image.tobytes(),
+    )
+
+    # Define database and collection names
+    database_name = "test_database"
+    collection_name = "test_collection"
+    index_name = "vs_1"  # Ensure this matches your intended index name
+    distance_metric = "cosine"
+
+    client = CustomMongoClient(
+        "mongodb://localhost:27017/?directConnection=true&serverSelectionTimeoutMS=2000",
+        get_embedding=get_embedding
+    )
+    # Create the search index
+    client._create_search_index(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        distance_metric=distance_metric,
+        embedding_field="content_embedding", #voyageai :)
+    )
+
+    # Wait for the search index to be READY
+    logger.info("Waiting for the search index to be READY...")
+    index_ready = client.wait_for_index_ready(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        max_attempts=10,
+        wait_seconds=1
+    )
+
+    if index_ready:
+        logger.info(f"Search index '{index_name}' is now READY and available!")
+        print("Index is ready!")
+    else:
+        logger.error("Index creation process exceeded wait limit or failed.")
+        print("Index creation process exceeded wait limit.")
+        return
+
+    # Insert documents
+    pdf_url = "https://www.fdrlibrary.org/documents/356632/390886/readingcopy.pdf"
+    collection = client[database_name][collection_name]
+    page_number = 0
+
+    def store(embeddings):
+        nonlocal page_number
+        # The page number is all that is needed to find the page again; the image itself is not stored
+        documents = [
+            # stored as a BSON float32 vector (4 bytes per dimension), as insert_documents does
+            {"_id": page_number + i, "page": page_number + i, "content_embedding": to_bson_vector(embedding)}
+            for i, embedding in enumerate(embeddings)
+        ]
+        # One window (RENDER_WINDOW documents) per call stays far below the 16MB batch limit
+        collection.insert_many(documents, ordered=False, bypass_document_validation=True)
+        page_number += len(documents)
+
+    # Each render window is embedded on a worker; the next window is only rendered once fewer
+    # than EMBED_WORKERS are in flight, so every worker stays busy while page images are bounded.
+    # Windows are stored in page order as they complete.
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+        in_flight = deque()
+        for page_images in pdf_url_to_screenshots(pdf_url):
+            if len(in_flight) == EMBED_WORKERS:
+                store(in_flight.popleft().result())
+            in_flight.append(executor.submit(embedder.get_embeddings, page_images))
+        while in_flight:
+            store(in_flight.popleft().result())
+
+    print("Inserted documents into the collection.")
+
+    # wait until the index has caught up with the inserted pages
+    client.wait_for_indexing(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        min_docs=page_number,
+        embedding_field="content_embedding", #voyageai :)
+    )
+    print("Searching for documents...")
+    # Perform searches
+    # 1. Vector-Based Search
+    query = "The consequences of a dictator's peace"
+    logger.info(f"Performing vector-based search with query: '{query}'")
+    vector_results = client.vector_search(
+        query=query,
+        limit=3,
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        embedding_field="content_embedding", #voyageai :)
+        fields=["page"],  # only what is printed below
+    )
+    print("\n--- Vector-Based Search Results ---")
+    for doc in vector_results:
+        print(f"ID: {doc.get('_id')}\nPage: {doc.get('page')}\nScore: {doc.get('score')}\n")
+
+
+if __name__ == "__main__":
+    main()
 
 """
 INFO:mdb_toolkit:Initializing mdb_toolkit package
@@ -139,17 +226,14 @@ INFO:mdb_toolkit.core:Vector search completed. Found 3 documents.
 
 --- Vector-Based Search Results ---
 ID: 5
-Content: <PIL.PpmImagePlugin.PpmImageFile image mode=RGB size=488x667 at 0x133C7F5E0>
-Meta Data: None
+Page: 5
 Score: 0.6876784563064575
 
 ID: 20
-Content: <PIL.PpmImagePlugin.PpmImageFile image mode=RGB size=502x667 at 0x133C7F8B0>
-Meta Data: None
+Page: 20
 Score: 0.6666251420974731
 
 ID: 3
-Content: <PIL.PpmImagePlugin.PpmImageFile image mode=RGB size=504x667 at 0x133C7F580>
-Meta Data: None
+Page: 3
 Score: 0.664629340171814
 """
\ No newline at end of file
@@ -1,18 +1,15 @@
 import logging
-import openai
 from typing import List
 
-# load .ENV file
 from dotenv import load_dotenv
-load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 import voyageai
 voyageai_api_key = "pa-"
 vo = voyageai.Client(api_key=voyageai_api_key)
+# Maximum number of texts sent in a single embed request
+EMBED_BATCH = 128
 
 # Get Embedding Function
 def get_embedding(text: str) -> List[float]:
@@ -26,89 +23,126 @@ def get_embedding(text: str) -> List[float]:
         logger.error(f"Error generating embedding: {str(e)}")
         raise
 
-# Example usage
-from mdb_toolkit import CustomMongoClient
-print("mdb_toolkit package imported successfully")
-
-# Define database and collection names
-database_name = "test_database"
-collection_name = "test_collection"
-index_name = "vs_1"  # Ensure this matches your intended index name
-distance_metric = "cosine"
-
-client = CustomMongoClient(
-    "mongodb://localhost:27017/?directConnection=true&serverSelectionTimeoutMS=2000",
-    get_embedding=get_embedding
-)
-# Create the search index
-client._create_search_index(
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    distance_metric=distance_metric,
-    embedding_field="content_embedding", #voyageai :)
-)
-
-# Wait for the search index to be READY
-logger.info("Waiting for the search index to be READY...")
-index_ready = client.wait_for_index_ready(
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    max_attempts=10,
-    wait_seconds=1
-)
-
-if index_ready:
-    logger.info(f"Search index '{index_name}' is now READY and available!")
-    print("Index is ready!")
-else:
-    logger.error("Index creation process exceeded wait limit or failed.")
-    print("Index creation process exceeded wait limit.")
-    exit()
-
-# Insert documents
-documents = [
-    "The Mediterranean diet emphasizes fish, olive oil, and vegetables, believed to reduce chronic diseases.",
-    "Photosynthesis in plants converts light energy into glucose and produces essential oxygen.",
-    "20th-century innovations, from radios to smartphones, centered on electronic advancements.",
-    "Rivers provide water, irrigation, and habitat for aquatic species, vital for ecosystems.",
-    "Apple’s conference call to discuss fourth fiscal quarter results and business updates is scheduled for Thursday, November 2, 2023 at 2:00 p.m. PT / 5:00 p.m. ET.",
-    "Shakespeare's works, like 'Hamlet' and 'A Midsummer Night's Dream,' endure in literature."
-]
-# turn those documents into objects with _id and content
-documents = [
-    {"_id": i, "content": doc} for i, doc in enumerate(documents)
-]
-# Insert documents into the collection
-client.insert_documents(
-    database_name=database_name,
-    collection_name=collection_name,
-    documents=documents,
-    fields_to_embed=["content"]
-)
-print("Inserted documents into the collection.")
-
-# insert pause to allow index update
-import time
-time.sleep(5)
-print("Searching for documents...")
-# Perform searches
-# 1. Vector-Based Search
-query = "When is Apple's conference call scheduled?"
-logger.info(f"Performing vector-based search with query: '{query}'")
-vector_results = client.vector_search(
-    query=query,
-    limit=3,
-    database_name=database_name,
-    collection_name=collection_name,
-    index_name=index_name,
-    embedding_field="content_embedding", #voyageai :)
-)
-print("\n--- Vector-Based Search Results ---")
-for doc in vector_results:
-    print(f"ID: {doc.get('_id')}\nContent: {doc.get('content')}\nMeta Data: {doc.get('meta_data')}\nScore: {doc.get('score')}\n")
+# Batched Embedding Function (one request per EMBED_BATCH texts)
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    texts = [text.replace("\n", " ") for text in texts]
+    try:
+        embeddings = []
+        for start in range(0, len(texts), EMBED_BATCH):
+            embeddings.extend(vo.embed(
+                texts[start:start + EMBED_BATCH], model="voyage-3", input_type="document"
+            ).embeddings)
+        return embeddings
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {str(e)}")
+        raise
 
+# Example usage
+from mdb_toolkit import CustomMongoClient, CachedEmbedder
+
+
+def main():
+    # load .ENV file and set up logging here, when run as a script, rather than on import
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    print("mdb_toolkit package imported successfully")
+
+    # Keep embeddings on disk so re-running the demo does not call Voyage again for the same texts
+    embedder = CachedEmbedder(get_embedding, get_embeddings, model="voyage-3")
+
+    # Define database and collection names
+    database_name = "test_database"
+    collection_name = "test_collection"
+    index_name = "vs_1"  # Ensure this matches your intended index name
+    distance_metric = "cosine"
+
+    client = CustomMongoClient(
+        "mongodb://localhost:27017/?directConnection=true&serverSelectionTimeoutMS=2000",
+        get_embedding=embedder.get_embedding,
+        get_embeddings=embedder.get_embeddings,
+        normalize_embeddings=True,  # unit vectors, so the "cosine" index below is built as dotProduct
+    )
+    # Create the search index
+    client._create_search_index(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        distance_metric=distance_metric,
+        embedding_field="content_embedding", #voyageai :)
+        quantization="scalar",  # index int8 copies of the vectors: ~4x less index memory
+    )
+
+    # Wait for the search index to be READY
+    logger.info("Waiting for the search index to be READY...")
+    index_ready = client.wait_for_index_ready(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        max_attempts=10,
+        wait_seconds=1
+    )
+
+    if index_ready:
+        logger.info(f"Search index '{index_name}' is now READY and available!")
+        print("Index is ready!")
+    else:
+        logger.error("Index creation process exceeded wait limit or failed.")
+        print("Index creation process exceeded wait limit.")
+        return
+
+    # Insert documents
+    documents = [
+        "The Mediterranean diet emphasizes fish, olive oil, and vegetables, believed to reduce chronic diseases.",
+        "Photosynthesis in plants converts light energy into glucose and produces essential oxygen.",
+        "20th-century innovations, from radios to smartphones, centered on electronic advancements.",
+        "Rivers provide water, irrigation, and habitat for aquatic species, vital for ecosystems.",
+        "Apple’s conference call to discuss fourth fiscal quarter results and business updates is scheduled for Thursday, November 2, 2023 at 2:00 p.m. PT / 5:00 p.m. ET.",
+        "Shakespeare's works, like 'Hamlet' and 'A Midsummer Night's Dream,' endure in literature."
+    ]
+    # turn those documents into objects with _id and content
+    documents = [
+        {"_id": i, "content": doc} for i, doc in enumerate(documents)
+    ]
+    # Insert documents into the collection
+    client.insert_documents(
+        database_name=database_name,
+        collection_name=collection_name,
+        documents=documents,
+        fields_to_embed=["content"],
+        batch_size=EMBED_BATCH,
+    )
+    print("Inserted documents into the collection.")
+
+    # wait until the index has caught up with the inserted documents
+    client.wait_for_indexing(
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        min_docs=len(documents),
+        embedding_field="content_embedding", #voyageai :)
+    )
+    print("Searching for documents...")
+    # Perform searches
+    # 1. Vector-Based Search
+    query = "When is Apple's conference call scheduled?"
+    logger.info(f"Performing vector-based search with query: '{query}'")
+    vector_results = client.vector_search(
+        query=query,
+        limit=3,
+        database_name=database_name,
+        collection_name=collection_name,
+        index_name=index_name,
+        embedding_field="content_embedding", #voyageai :)
+        fields=["content", "meta_data"],  # only what is printed below
+    )
+    print("\n--- Vector-Based Search Results ---")
+    for doc in vector_results:
+        print(f"ID: {doc.get('_id')}\nContent: {doc.get('content')}\nMeta Data: {doc.get('meta_data')}\nScore: {doc.get('score')}\n")
+
+
+if __name__ == "__main__":
+    main()
 
 """
 INFO:mdb_toolkit:Initializing mdb_toolkit package